@@ -0,0 +1,101 @@
+"""Latency of the feed endpoints at several table sizes.
+
+Seeds the articles table directly with published rows, then times
+/api/news (cursor pages) and /api/news/<page> through the Flask test client,
+cold (right after a generation bump) and warm (served from the page cache).
+
+    python benchmarks/bench_feed.py --sizes 100,1000,10000 --requests 200
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.common import configure_environment, percentile, format_ms
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='100,1000,10000', help='comma separated article counts')
+    parser.add_argument('--requests', type=int, default=200, help='requests per measurement')
+    parser.add_argument('--pages', type=int, default=5, help='pages walked per cursor request')
+    return parser.parse_args()
+
+def seed_articles(db, Article, total, already):
+    """Add published articles until the table holds total rows, spread over the last 24 hours"""
+    now = datetime.utcnow()
+    panels = [f"/images/{'0' * 63}{i}.webp" for i in range(4)]
+    prompts = [f"Panel {i} prompt" for i in range(4)]
+    rows = [{
+        'source_id': f"bench://{n}",
+        'source': 'nytimes',
+        'title': f"Benchmark story {n}",
+        'comic_header': f"Header {n}",
+        'comic_summary': 'A short summary of the story. ' * 4,
+        'image_urls': panels,
+        'image_prompts': prompts,
+        'created_at': now - timedelta(seconds=(n * 86000) // max(total, 1)),
+        'updated_at': now,
+        'stage': 'published'
+    } for n in range(already, total)]
+    for start in range(0, len(rows), 1000):
+        db.session.execute(Article.__table__.insert(), rows[start:start + 1000])
+    db.session.commit()
+
+def measure(client, path_for, requests, before=None):
+    samples = []
+    for i in range(requests):
+        if before:
+            before()
+        started = time.perf_counter()
+        response = client.get(path_for(i))
+        samples.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.status_code
+    return samples
+
+def main():
+    args = parse_args()
+    configure_environment(FEED_GENERATION_CHECK_SECONDS=3600)
+
+    from app import create_app, setup_database
+    from models import db, Article
+    from services.feed import bump_generation
+
+    app = create_app('web')
+    setup_database(app)
+
+    client = app.test_client()
+    cursors = []
+
+    def cursor_path(i):
+        cursor = cursors[i % len(cursors)]
+        return f"/api/news?cursor={cursor}" if cursor else "/api/news"
+
+    def page_path(i):
+        return f"/api/news/{i % args.pages + 1}"
+
+    print(f"{'rows':>8} {'endpoint':<18} {'cold p50':>10} {'cold p99':>10} {'warm p50':>10} {'warm p99':>10}")
+    seeded = 0
+    with app.app_context():
+        for size in [int(size) for size in args.sizes.split(',')]:
+            seed_articles(db, Article, size, seeded)
+            seeded = size
+            bump_generation()
+
+            # Collect the cursors of the first pages so cursor requests walk the feed like a reader
+            cursors[:] = [None]
+            for _ in range(args.pages - 1):
+                next_cursor = client.get(cursor_path(len(cursors) - 1)).get_json()['next_cursor']
+                if not next_cursor:
+                    break
+                cursors.append(next_cursor)
+
+            for name, path_for in (('/api/news?cursor', cursor_path), ('/api/news/<page>', page_path)):
+                cold = measure(client, path_for, args.requests, before=bump_generation)
+                warm = measure(client, path_for, args.requests)
+                print(f"{size:>8} {name:<18} {format_ms(percentile(cold, 50))} {format_ms(percentile(cold, 99))}"
+                      f" {format_ms(percentile(warm, 50))} {format_ms(percentile(warm, 99))}")
+
+if __name__ == '__main__':
+    main()
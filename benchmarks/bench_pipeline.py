@@ -0,0 +1,119 @@
+"""End-to-end benchmark of fetch_and_process_articles against the offline stand-ins.
+
+Runs the job once against a cold database (every article is new) and once
+more after the stub sources publish a new set of stories, then reports wall
+time, the per-stage timings recorded on the RefreshRun, and DB writes.
+
+    python benchmarks/bench_pipeline.py --articles 40 --claude-latency 1.5 --replicate-latency 2
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.common import configure_environment, WriteCounter
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--articles', type=int, default=20, help='stories per source and run')
+    parser.add_argument('--sources', default='nytimes', help='comma separated NEWS_SOURCES')
+    parser.add_argument('--runs', type=int, default=2)
+    parser.add_argument('--mode', default='concurrent', choices=['concurrent', 'sequential', 'batch'])
+    parser.add_argument('--text-words', type=int, default=300)
+    parser.add_argument('--image-width', type=int, default=1344, help='width of the 16:9 panels the stub serves')
+    parser.add_argument('--source-latency', type=float, default=0.05)
+    parser.add_argument('--claude-latency', type=float, default=0.5)
+    parser.add_argument('--replicate-latency', type=float, default=0.5)
+    parser.add_argument('--jitter', type=float, default=0.1)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='failure rate of every provider')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='share of Claude and Replicate calls answered 429')
+    parser.add_argument('--claude-rpm', type=float, default=6000, help='CLAUDE_RATE_PER_MINUTE')
+    parser.add_argument('--replicate-rpm', type=float, default=6000, help='REPLICATE_RATE_PER_MINUTE')
+    parser.add_argument('--duplicate-rate', type=float, default=0.0, help='share of Guardian stories repeating an NYTimes one')
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    configure_environment(
+        NEWS_SOURCES=args.sources,
+        PIPELINE_MODE=args.mode,
+        GUARDIAN_PAGE_SIZE=10,
+        GUARDIAN_MAX_PAGES=max(1, -(-args.articles // 10))
+    )
+
+    from app import create_app, setup_database
+    from models import db, RefreshRun
+
+    app = create_app('job')
+    setup_database(app)
+
+    from services import stubs
+    from services.jobs import fetch_and_process_articles
+    from services.image_store import get_store_dir
+
+    def profile(latency, offset, throttle_rate=0.0):
+        return stubs.StubProfile(latency, args.jitter, args.error_rate, seed=args.seed + offset,
+                                 throttle_rate=throttle_rate)
+
+    news = stubs.StubNewsServer(profile(args.source_latency, 1), articles=args.articles,
+                                text_words=args.text_words, image_width=args.image_width,
+                                seed=args.seed, duplicate_rate=args.duplicate_rate).start()
+    stubs.install(
+        app, news,
+        claude=stubs.StubAnthropicClient(profile(args.claude_latency, 2, args.throttle_rate)),
+        replicate=stubs.StubReplicateClient(profile(args.replicate_latency, 3, args.throttle_rate), news.image_base_url),
+        batch=stubs.StubBatchTransport(profile(args.claude_latency, 4))
+    )
+    app.config['CLAUDE_BATCH_POLL_INTERVAL'] = 0.05
+    app.config['SOURCE_BACKOFF_BASE'] = 0.01
+    app.config['PROVIDER_BACKOFF_BASE'] = 0.05
+    app.config['CLAUDE_RATE_PER_MINUTE'] = args.claude_rpm
+    app.config['REPLICATE_RATE_PER_MINUTE'] = args.replicate_rpm
+
+    with app.app_context():
+        counter = WriteCounter(db)
+
+    print(f"mode={args.mode} sources={args.sources} articles={args.articles} error_rate={args.error_rate} "
+          f"throttle_rate={args.throttle_rate}")
+    try:
+        for run_number in range(1, args.runs + 1):
+            if run_number > 1:
+                news.publish()
+            counter.reset()
+            started = time.perf_counter()
+            fetch_and_process_articles(app=app)
+            elapsed = time.perf_counter() - started
+
+            with app.app_context():
+                run = RefreshRun.query.order_by(RefreshRun.id.desc()).first()
+                timings = json.loads(run.timings or '{}')
+                counts = json.loads(run.counts or '{}')
+
+            print(f"\nrun {run_number}: {elapsed:.2f}s wall, status={run.status}")
+            for stage, seconds in timings.items():
+                print(f"  {stage:<12}{seconds:8.3f}s")
+            print(f"  counts      {counts}")
+            print(f"  db writes   {counter.statements} statements, {counter.commits} commits")
+
+        with app.app_context():
+            report_image_store(get_store_dir())
+    finally:
+        news.stop()
+
+def report_image_store(store_dir):
+    """Average file size of the mirrored panels and of each resized variant width"""
+    sizes = {}
+    for name in os.listdir(store_dir):
+        stem, ext = os.path.splitext(name)
+        if ext == '.webp':
+            _, _, width = stem.partition('-')
+            sizes.setdefault(width or 'original', []).append(os.path.getsize(os.path.join(store_dir, name)))
+    print("\nimage store")
+    for width, values in sorted(sizes.items(), key=lambda item: (item[0] == 'original', len(item[0]), item[0])):
+        print(f"  {width:<12}{len(values):5d} files {sum(values) / len(values) / 1024:8.1f} KB avg")
+
+if __name__ == '__main__':
+    main()
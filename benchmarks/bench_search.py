@@ -0,0 +1,110 @@
+"""Latency of /api/search at several table sizes.
+
+Seeds the articles table with published rows whose titles, summaries and
+prompts are drawn from a Zipf-distributed vocabulary, like real text, then
+times first pages and cursor pages through the Flask test client. Queries
+use words of typical frequency; "common word" queries use the ten most
+frequent words, which match most rows and are the worst case.
+
+    python benchmarks/bench_search.py --sizes 1000,10000,50000 --requests 200
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.common import configure_environment, percentile, format_ms
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000,50000', help='comma separated article counts')
+    parser.add_argument('--requests', type=int, default=200, help='requests per measurement')
+    parser.add_argument('--vocabulary', type=int, default=20000, help='distinct words in the seeded text')
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args()
+
+def build_vocabulary(base_words, size):
+    """size distinct words built from pairs of stub words, with Zipf weights (the n-th word has weight 1/n)"""
+    words = [a + b for a in base_words for b in base_words if a != b][:size]
+    return words, [1 / rank for rank in range(1, len(words) + 1)]
+
+def seed_articles(db, Article, vocabulary, total, already, rng):
+    """Add published articles with random-word text until the table holds total rows"""
+    now = datetime.utcnow()
+    words, weights = vocabulary
+
+    def phrase(count):
+        return ' '.join(rng.choices(words, weights, k=count))
+
+    rows = [{
+        'source_id': f"bench://{n}",
+        'source': 'nytimes',
+        'title': phrase(8),
+        'comic_header': phrase(6),
+        'comic_summary': phrase(45),
+        'image_urls': [f"/images/{'0' * 63}{i}.webp" for i in range(4)],
+        'image_prompts': [phrase(40) for _ in range(4)],
+        'created_at': now - timedelta(seconds=n),
+        'updated_at': now,
+        'stage': 'published'
+    } for n in range(already, total)]
+    for start in range(0, len(rows), 1000):
+        db.session.execute(Article.__table__.insert(), rows[start:start + 1000])
+    db.session.commit()
+
+def measure(client, paths):
+    samples, results = [], 0
+    for path in paths:
+        started = time.perf_counter()
+        response = client.get(path)
+        samples.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.status_code
+        results += len(response.get_json()['articles'])
+    return samples, results / max(len(paths), 1)
+
+def main():
+    args = parse_args()
+    configure_environment()
+
+    from app import create_app, setup_database
+    from models import db, Article
+    from services.stubs import WORDS
+
+    app = create_app('web')
+    setup_database(app)
+
+    rng = random.Random(args.seed)
+    client = app.test_client()
+    vocabulary = build_vocabulary(WORDS, args.vocabulary)
+    words = vocabulary[0]
+    # Words ranked 100-2000 appear in a few percent of stories, like the names and topics readers search for
+    typical = words[100:2000]
+
+    print(f"{'rows':>8} {'query':<16} {'p50':>10} {'p99':>10} {'results':>8}")
+    seeded = 0
+    with app.app_context():
+        for size in [int(size) for size in args.sizes.split(',')]:
+            seed_articles(db, Article, vocabulary, size, seeded, rng)
+            seeded = size
+
+            one_word = [f"/api/search?q={rng.choice(typical)}" for _ in range(args.requests)]
+            two_words = [f"/api/search?q={rng.choice(typical)}+{rng.choice(words[:100])}" for _ in range(args.requests)]
+            prefixes = [f"/api/search?q={rng.choice(typical)[:-2]}" for _ in range(args.requests)]
+            common = [f"/api/search?q={rng.choice(words[:10])}" for _ in range(args.requests)]
+            second_pages = []
+            for path in one_word[:args.requests]:
+                next_cursor = client.get(path).get_json()['next_cursor']
+                if next_cursor:
+                    second_pages.append(f"{path}&cursor={next_cursor}")
+
+            for name, paths in (('one word', one_word), ('two words', two_words),
+                                ('prefix', prefixes), ('cursor page 2', second_pages), ('common word', common)):
+                samples, results = measure(client, paths)
+                print(f"{size:>8} {name:<16} {format_ms(percentile(samples, 50))} {format_ms(percentile(samples, 99))}"
+                      f" {results:8.1f}")
+
+if __name__ == '__main__':
+    main()
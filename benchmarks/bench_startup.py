@@ -0,0 +1,83 @@
+"""Startup time of the web and job processes.
+
+Each measurement runs in a fresh interpreter, like a new web worker or a
+worker restart: the time to import the app module, create the app, set up
+the schema of an existing database and answer the first feed request (web),
+or to import the pipeline and create the first provider clients (job). It
+also reports how many modules each step loaded and whether the provider
+SDKs were among them.
+
+    python benchmarks/bench_startup.py --repeat 10
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.common import configure_environment, ROOT
+
+SDKS = ('anthropic', 'replicate')
+
+# Runs in the child interpreter; prints {step: [seconds since start, modules loaded so far, SDKs loaded so far]}
+PROBE = '''
+import json, sys, time
+steps = {}
+started = time.perf_counter()
+
+def mark(step):
+    sdks = [name for name in %(sdks)r if name in sys.modules]
+    steps[step] = [time.perf_counter() - started, len(sys.modules), sdks]
+
+from app import create_app, setup_database
+mark('import app')
+app = create_app(%(role)r)
+mark('create_app')
+setup_database(app)
+mark('setup_database')
+if %(role)r == 'web':
+    assert app.test_client().get('/api/news').status_code == 200
+    mark('first request')
+else:
+    from services.jobs import fetch_and_process_articles
+    mark('import jobs')
+    with app.app_context():
+        from services.claude import create_client as create_claude_client
+        from services.replicate import create_client as create_replicate_client
+        create_claude_client('key')
+        create_replicate_client('key')
+    mark('provider clients')
+print(json.dumps(steps))
+'''
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='fresh interpreters per role')
+    return parser.parse_args()
+
+def probe(role):
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE % {'role': role, 'sdks': SDKS}],
+        cwd=ROOT, env=os.environ, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    args = parse_args()
+    configure_environment()
+
+    print(f"{'role':<5} {'step':<18} {'elapsed p50':>11} {'max':>10} {'modules':>8}  sdks loaded")
+    for role in ('web', 'job'):
+        # The first run creates the database, so every measured run starts against an existing schema
+        probe(role)
+        runs = [probe(role) for _ in range(args.repeat)]
+        for step in runs[0]:
+            seconds = [run[step][0] for run in runs]
+            _, modules, sdks = runs[-1][step]
+            print(f"{role:<5} {step:<18}  {statistics.median(seconds) * 1000:8.1f}ms {max(seconds) * 1000:8.1f}ms "
+                  f"{modules:8d}  {', '.join(sdks) or '-'}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Shared setup for the benchmarks: throwaway databases and the offline stand-ins.
+
+configure_environment() must run before create_app(), since the app reads its
+configuration from the environment when it is created.
+"""
+import os
+import statistics
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def configure_environment(**overrides):
+    """Point the app at a fresh temporary directory and return its path"""
+    workdir = tempfile.mkdtemp(prefix='jsj-bench-')
+    os.environ.update({
+        'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'news.db')}",
+        'SUMMARY_CACHE_DATABASE_URI': f"sqlite:///{os.path.join(workdir, 'summary_cache.db')}",
+        'IMAGE_STORE_DIR': os.path.join(workdir, 'images'),
+        'ARTICLE_ARCHIVE_DIR': os.path.join(workdir, 'archive'),
+        'PROMETHEUS_MULTIPROC_DIR': os.path.join(workdir, 'metrics'),
+        'RUN_SCHEDULER': 'false',
+        'REPLICATE_POLL_INTERVAL': '0.05',
+    })
+    os.environ.update({key: str(value) for key, value in overrides.items()})
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    return workdir
+
+class WriteCounter:
+    """Counts INSERT/UPDATE/DELETE statements and commits across every engine of the app"""
+
+    def __init__(self, db):
+        from sqlalchemy import event
+        self.statements = 0
+        self.commits = 0
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', self._on_execute)
+            event.listen(engine, 'commit', self._on_commit)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip()[:6].upper() in ('INSERT', 'UPDATE', 'DELETE'):
+            self.statements += 1
+
+    def _on_commit(self, conn):
+        self.commits += 1
+
+    def reset(self):
+        self.statements = 0
+        self.commits = 0
+
+def percentile(samples, pct):
+    if len(samples) < 2:
+        return samples[0] if samples else 0.0
+    return statistics.quantiles(samples, n=100, method='inclusive')[pct - 1]
+
+def format_ms(seconds):
+    return f"{seconds * 1000:8.2f}ms"
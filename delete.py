@@ -1,19 +1,23 @@
-from app import app, db
-from models import Article
+from app import create_app
+from models import db, Article, ArticleBody
+from services.feed import bump_generation
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 def delete_all_articles():
+    app = create_app('job')
     with app.app_context():
         try:
             # Get count of articles before deletion
             count = Article.query.count()
             
             # Delete all articles
+            ArticleBody.query.delete()
             Article.query.delete()
             db.session.commit()
+            bump_generation()
             
             logger.info(f"Successfully deleted {count} articles from the database")
             print(f"Successfully deleted {count} articles from the database")
@@ -0,0 +1,34 @@
+"""gunicorn settings for the web tier: gunicorn -c gunicorn.conf.py main:app
+
+Ingestion runs in worker.py, so web processes only serve requests. Each open
+/api/news/stream holds a thread for as long as the reader stays connected,
+so workers are threaded; FEED_EVENT_MAX_STREAMS caps the streams per process
+below WEB_THREADS and readers past the cap fall back to polling.
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_WORKERS', 2))
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', 32))
+# gthread workers heartbeat from their main loop, so long-lived streams never trip the timeout
+timeout = int(os.environ.get('WEB_TIMEOUT', 60))
+graceful_timeout = 10
+
+def on_starting(server):
+    # Runs once in the master before any worker starts, so no worker has recorded a metric yet
+    # and the schema is upgraded once rather than by every worker importing main:app
+    from app import create_app, setup_database, clear_stale_metrics
+    from models import db
+
+    app = create_app('web')
+    setup_database(app)
+    with app.app_context():
+        # Workers build their own engine; don't fork the master's pooled connections into them
+        db.engine.dispose()
+    clear_stale_metrics(app.config["METRICS_DIR"])
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,4 +1,19 @@
-from app import app
+import atexit
+import os
+from app import create_app, setup_database, start_scheduler, clear_stale_metrics
+
+# Importing main:app never touches the schema: gunicorn workers import it side by side,
+# so deployments upgrade the database once beforehand (migrate_db.py, gunicorn.conf.py)
+app = create_app('web')
 
 if __name__ == "__main__":
+    from prometheus_client import multiprocess
+
+    # Upgrade an existing database in place before serving it; the feed reads columns older databases lack
+    setup_database(app)
+    # gunicorn.conf.py does the same for deployments
+    clear_stale_metrics(app.config["METRICS_DIR"])
+    atexit.register(multiprocess.mark_process_dead, os.getpid())
+    if app.config["RUN_SCHEDULER"]:
+        start_scheduler(app)
     app.run(host="0.0.0.0", port=5000)
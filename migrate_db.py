@@ -1,12 +1,24 @@
-from app import app, db
+import sys
+from app import create_app, setup_database
+from models import db
 
-def migrate_database():
+def migrate_database(app):
+    print("Creating missing tables and applying schema migrations...")
+    applied = setup_database(app)
+    print(f"Database migration completed successfully ({len(applied)} migrations applied).")
+
+def reset_database(app):
     with app.app_context():
         print("Dropping all tables...")
-        db.drop_all()
-        print("Creating all tables with updated schema...")
-        db.create_all()
-        print("Database migration completed successfully.")
+        # Only the main database; the summary cache bind survives resets
+        db.drop_all(bind_key=None)
+    print("Creating all tables with updated schema...")
+    setup_database(app)
+    print("Database reset completed successfully.")
 
 if __name__ == "__main__":
-    migrate_database()
+    app = create_app('job')
+    if "--reset" in sys.argv:
+        reset_database(app)
+    else:
+        migrate_database(app)
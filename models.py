@@ -1,14 +1,128 @@
-from app import db
+import zlib
 from datetime import datetime
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import DeclarativeBase
+
+class Base(DeclarativeBase):
+    pass
+
+# Bound to an app by create_app() in app.py
+db = SQLAlchemy(model_class=Base)
+
+# Article processing stages, in order; only published articles are shown in the feed
+STAGE_FETCHED = 'fetched'
+STAGE_SUMMARIZED = 'summarized'
+STAGE_IMAGES_PENDING = 'images_pending'
+STAGE_IMAGES_DONE = 'images_done'
+STAGE_PUBLISHED = 'published'
+STAGE_FAILED = 'failed'  # Gave up after STAGE_MAX_ATTEMPTS tries of one stage
+STAGE_DUPLICATE = 'duplicate'  # Near-duplicate of duplicate_of; merged into that story and never rendered
+RESUMABLE_STAGES = (STAGE_FETCHED, STAGE_SUMMARIZED, STAGE_IMAGES_PENDING, STAGE_IMAGES_DONE)
 
 class Article(db.Model):
+    __table_args__ = (
+        # Retention sweeps by created_at; the feed pages published rows on (created_at, id)
+        db.Index('ix_article_created_at_id', 'created_at', 'id'),
+        db.Index('ix_article_stage_created_at_id', 'stage', 'created_at', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     source_id = db.Column(db.String(200), unique=True)  # Changed from guardian_id
     source = db.Column(db.String(50), default='guardian')  # Added source field
     title = db.Column(db.String(500))
-    original_text = db.Column(db.Text)
     comic_header = db.Column(db.Text)  # Add this field
     comic_summary = db.Column(db.Text)
-    image_urls = db.Column(db.Text)  # Store multiple URLs as JSON string
-    image_prompts = db.Column(db.Text)  # Store prompts as JSON string
+    image_urls = db.Column(db.JSON)  # List of panel URLs
+    image_prompts = db.Column(db.JSON)  # List of panel prompts
+    image_variants = db.Column(db.JSON)  # Per panel: srcset, size and blur placeholder, or null; see services/image_variants.py
+    simhash = db.Column(db.BigInteger)  # SimHash of title and text, see services/similarity.py
+    duplicate_of = db.Column(db.Integer)  # Story this one was merged into, for STAGE_DUPLICATE rows
+    source_rank = db.Column(db.Integer)  # Position in its source's feed when fetched; top stories are processed first
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    stage = db.Column(db.String(20), default=STAGE_FETCHED)
+    stage_attempts = db.Column(db.Integer, default=0)  # Failed tries of the current stage
+    last_error = db.Column(db.Text)
+    raw_summary = db.Column(db.Text)  # Full Claude response, kept so a retry never pays for it again
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # The story text is only read by the summary stage, so it lives compressed in its own table
+    body = db.relationship('ArticleBody', uselist=False, lazy='select', viewonly=True)
+
+    @property
+    def original_text(self):
+        return self.body.text if self.body else None
+
+class ArticleBody(db.Model):
+    """zlib-compressed story text of an article, kept out of the rows the feed reads"""
+    article_id = db.Column(db.Integer, db.ForeignKey('article.id', ondelete='CASCADE'), primary_key=True)
+    content = db.Column(db.LargeBinary)
+
+    @property
+    def text(self):
+        return zlib.decompress(self.content).decode('utf-8') if self.content else None
+
+    @staticmethod
+    def compress(text):
+        return zlib.compress((text or '').encode('utf-8'))
+
+class SummaryCache(db.Model):
+    """Validated Claude responses keyed by a hash of article text, model and prompt version"""
+    __bind_key__ = 'cache'  # Kept in its own database so migrate_db.py/delete.py resets don't discard it
+
+    key = db.Column(db.String(64), primary_key=True)
+    model = db.Column(db.String(100))
+    response = db.Column(db.Text)
+    hits = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class FeedState(db.Model):
+    """Single row holding the feed generation; the ingestion job bumps it after each run"""
+    id = db.Column(db.Integer, primary_key=True)
+    generation = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class ArchivedArticle(db.Model):
+    """Cold storage for expired articles; the full row is kept as zlib-compressed JSON"""
+    id = db.Column(db.Integer, primary_key=True)
+    # Id the article had in the hot table; SQLite reuses article ids once the table empties, so not unique
+    article_id = db.Column(db.Integer, index=True)
+    source_id = db.Column(db.String(200), index=True)
+    source = db.Column(db.String(50))
+    title = db.Column(db.String(500))
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+    payload = db.Column(db.LargeBinary)
+
+class JobLease(db.Model):
+    """Lease row that lets only one runner across processes or hosts hold a job at a time"""
+    name = db.Column(db.String(100), primary_key=True)
+    holder = db.Column(db.String(200))
+    acquired_at = db.Column(db.DateTime)
+    expires_at = db.Column(db.DateTime)
+
+class RefreshRun(db.Model):
+    """One run of the ingestion pipeline, queued by /api/refresh or the scheduler"""
+    id = db.Column(db.Integer, primary_key=True)
+    # 1 while queued or running, NULL once finished; the unique constraint allows only one active run
+    active_slot = db.Column(db.Integer, unique=True)
+    trigger = db.Column(db.String(20), default='manual')
+    status = db.Column(db.String(20), default='queued')  # queued, running, succeeded, failed
+    stage = db.Column(db.String(50))
+    counts = db.Column(db.Text)  # Per-stage counts as JSON string
+    timings = db.Column(db.Text)  # Seconds spent in each stage as JSON string
+    error = db.Column(db.Text)
+    requested_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+class FeedEvent(db.Model):
+    """One row per published article, read in id order by the /api/news/stream pollers of every web process"""
+    id = db.Column(db.Integer, primary_key=True)
+    article_id = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class SchemaMigration(db.Model):
+    """Schema changes applied to an existing database by services/migrations.py"""
+    version = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200))
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
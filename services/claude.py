@@ -1,38 +1,21 @@
-import anthropic
 import logging
 import re
+import sys
+import time
 from flask import current_app
+from services import summary_cache
+from services.metrics import CLAUDE_REQUEST_SECONDS
+from services.throttle import get_limiter
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def validate_api_key(api_key):
-    if not api_key or api_key == "test":
-        raise ValueError("Claude API key is not configured")
-
-def validate_response_format(response):
-    """Validate that the response contains all required tags with content"""
-    required_tags = ['comic_header', 'summary']
-    required_tags.extend([f'image_prompt{i}' for i in range(1, 5)])
-    
-    for tag in required_tags:
-        pattern = f'<{tag}>(.*?)</{tag}>'
-        match = re.search(pattern, response, re.DOTALL)
-        if not match or not match.group(1).strip():
-            logger.error(f"Missing or empty {tag} tag in response")
-            return False
-    return True
+MODEL = "claude-3-sonnet-20240229"
 
-def get_comic_summary(text):
-    api_key = current_app.config['CLAUDE_API_KEY']
+# Bump whenever PROMPT_TEMPLATE changes so cached summaries from the old prompt are not reused
+PROMPT_VERSION = 1
 
-    try:
-        validate_api_key(api_key)
-        logger.info("Creating comic summary using Claude API")
-        
-        client = anthropic.Client(api_key=api_key)
-        
-        prompt = """You are a comic strip artist creating a four-panel comic strip narrative from a news article. Follow these instructions EXACTLY:
+PROMPT_TEMPLATE = """You are a comic strip artist creating a four-panel comic strip narrative from a news article. Follow these instructions EXACTLY:
 
 1. Read this news article:
 {text}
@@ -75,28 +58,154 @@ CRITICAL RULES:
 - DO NOT use nested tags or modify tag names
 """
 
-        response = client.messages.create(
-            model="claude-3-sonnet-20240229",
-            max_tokens=1000,
-            temperature=0.7,
-            messages=[{
-                "role": "user",
-                "content": prompt.format(text=text)
-            }]
-        )
-
-        generated_text = response.content[0].text.strip()
-        
-        if not validate_response_format(generated_text):
+def validate_api_key(api_key):
+    if not api_key or api_key == "test":
+        raise ValueError("Claude API key is not configured")
+
+RESPONSE_TAGS = ['comic_header', 'summary'] + [f'image_prompt{i}' for i in range(1, 5)]
+TAG_PATTERN = re.compile(r'<(comic_header|summary|image_prompt[1-4])>(.*?)</\1>', re.DOTALL)
+
+def parse_response(response):
+    """Extract every tagged section of a response in a single pass"""
+    sections = {}
+    for match in TAG_PATTERN.finditer(response or ''):
+        sections.setdefault(match.group(1), match.group(2).strip())
+    return sections
+
+def validate_response_format(response):
+    """Validate that the response contains all required tags with content"""
+    sections = response if isinstance(response, dict) else parse_response(response)
+
+    for tag in RESPONSE_TAGS:
+        if not sections.get(tag):
+            logger.error(f"Missing or empty {tag} tag in response")
+            return False
+    return True
+
+class TagStreamParser:
+    """Incrementally parses streamed output, reporting each tagged section once it closes"""
+
+    def __init__(self):
+        self.text = ''
+        self.emitted = set()
+
+    def feed(self, chunk):
+        """Append a chunk and return the (tag, content) pairs completed by it"""
+        self.text += chunk
+        completed = []
+        # Responses are a few KB, so rescanning the buffer is cheap and tolerates out-of-order tags
+        for match in TAG_PATTERN.finditer(self.text):
+            tag = match.group(1)
+            if tag not in self.emitted:
+                self.emitted.add(tag)
+                completed.append((tag, match.group(2).strip()))
+        return completed
+
+def stream_response(client, request, on_tag, on_attempt=None):
+    """Stream a completion, calling on_tag(tag, content) as soon as each section closes.
+
+    on_attempt() is called before the stream starts, so a caller can drop
+    whatever an earlier, retried attempt started.
+    """
+    if on_attempt:
+        on_attempt()
+    parser = TagStreamParser()
+    with client.messages.stream(**request) as stream:
+        for chunk in stream.text_stream:
+            for tag, content in parser.feed(chunk):
+                on_tag(tag, content)
+    return parser.text.strip()
+
+def create_client(api_key):
+    """Anthropic client, or the CLAUDE_CLIENT_FACTORY stand-in when one is configured.
+
+    The SDK's own retries are off: services/throttle.py retries 429/5xx so
+    every attempt counts against the rate limit and the concurrency limit.
+    """
+    factory = current_app.config.get('CLAUDE_CLIENT_FACTORY')
+    if factory:
+        return factory(api_key)
+
+    import anthropic  # Takes about a second, so only processes that call Claude pay for it
+    return anthropic.Client(api_key=api_key, max_retries=0)
+
+def is_api_error(error):
+    """True for Anthropic SDK errors; if the SDK was never imported, no client could have raised one"""
+    anthropic = sys.modules.get('anthropic')
+    return anthropic is not None and isinstance(error, anthropic.APIError)
+
+def build_request(text):
+    """Message parameters for summarizing one article, shared by the direct and batch paths"""
+    return {
+        "model": MODEL,
+        "max_tokens": 1000,
+        "temperature": 0.7,
+        "messages": [{
+            "role": "user",
+            "content": PROMPT_TEMPLATE.format(text=text)
+        }]
+    }
+
+def get_comic_summary(text, on_tag=None, on_retry=None):
+    """Generate the tagged comic summary for an article.
+
+    With on_tag the completion is streamed and on_tag(tag, content) is called
+    for each section as it closes, so callers can start work before the whole
+    response has arrived. A stream retried after a 429/5xx starts over and may
+    produce different sections; on_retry() is called before the retry so the
+    caller can discard work started from the failed attempt.
+    """
+    api_key = current_app.config['CLAUDE_API_KEY']
+
+    try:
+        validate_api_key(api_key)
+
+        cache_key = summary_cache.make_key(text, MODEL, PROMPT_VERSION)
+        cached = summary_cache.get(cache_key)
+        if cached:
+            logger.debug("Using cached comic summary")
+            if on_tag:
+                for tag, content in parse_response(cached).items():
+                    on_tag(tag, content)
+            return cached
+
+        client = create_client(api_key)
+
+        request = build_request(text)
+
+        mode = 'stream' if on_tag else 'direct'
+        started = time.perf_counter()
+        limiter = get_limiter('claude', current_app.config)
+        try:
+            if on_tag:
+                attempts = 0
+
+                def on_attempt():
+                    nonlocal attempts
+                    attempts += 1
+                    if attempts > 1 and on_retry:
+                        on_retry()
+
+                generated_text = limiter.call(stream_response, client, request, on_tag, on_attempt)
+            else:
+                response = limiter.call(client.messages.create, **request)
+                generated_text = response.content[0].text.strip()
+        except Exception:
+            CLAUDE_REQUEST_SECONDS.labels(mode, 'error').observe(time.perf_counter() - started)
+            raise
+
+        valid = validate_response_format(generated_text)
+        CLAUDE_REQUEST_SECONDS.labels(mode, 'ok' if valid else 'invalid').observe(time.perf_counter() - started)
+        if not valid:
             logger.error("Generated response does not match required format")
             raise ValueError("Invalid response format from Claude API")
-            
-        logger.info("Successfully generated comic summary with validated format")
+
+        summary_cache.put(cache_key, MODEL, generated_text)
         return generated_text
 
-    except anthropic.APIError as e:
-        logger.error(f"Claude API error: {str(e)}")
-        raise ValueError(f"Claude API error: {str(e)}")
     except Exception as e:
+        if is_api_error(e):
+            logger.error(f"Claude API error: {str(e)}")
+            raise ValueError(f"Claude API error: {str(e)}")
         logger.error(f"Unexpected error in get_comic_summary: {str(e)}")
         raise Exception(f"Failed to generate summary: {str(e)}")
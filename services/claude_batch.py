@@ -0,0 +1,102 @@
+import logging
+import time
+from flask import current_app
+from services import summary_cache
+from services.metrics import CLAUDE_REQUEST_SECONDS
+from services.claude import MODEL, PROMPT_VERSION, build_request, validate_api_key, validate_response_format
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class AnthropicBatchTransport:
+    """Message Batches API transport; tests and benchmarks can pass any object with the same methods"""
+
+    def __init__(self, api_key):
+        import anthropic  # Loaded on first use, see create_client in services/claude.py
+
+        self.client = anthropic.Client(api_key=api_key)
+
+    def create(self, requests):
+        """Submit [{'custom_id': ..., 'params': {...}}, ...] and return the batch id"""
+        return self.client.messages.batches.create(requests=requests).id
+
+    def is_done(self, batch_id):
+        return self.client.messages.batches.retrieve(batch_id).processing_status == 'ended'
+
+    def results(self, batch_id):
+        """Yield (custom_id, text, error) for every request in a finished batch"""
+        for entry in self.client.messages.batches.results(batch_id):
+            if entry.result.type == 'succeeded':
+                yield entry.custom_id, entry.result.message.content[0].text.strip(), None
+            else:
+                yield entry.custom_id, None, entry.result.type
+
+    def cancel(self, batch_id):
+        self.client.messages.batches.cancel(batch_id)
+
+def get_transport():
+    """The configured CLAUDE_BATCH_TRANSPORT, or the real Message Batches API"""
+    transport = current_app.config.get('CLAUDE_BATCH_TRANSPORT')
+    if transport is not None:
+        return transport
+
+    api_key = current_app.config['CLAUDE_API_KEY']
+    validate_api_key(api_key)
+    return AnthropicBatchTransport(api_key)
+
+def summarize_batch(texts_by_id, transport=None):
+    """Summarize many articles with one message batch.
+
+    texts_by_id maps article ids to article text. Cached summaries are used
+    directly and only the rest are submitted. Returns {article id: summary}
+    for every article whose summary passed validate_response_format; the
+    others are left out.
+    """
+    summaries = {}
+    pending = {}
+    for article_id, text in texts_by_id.items():
+        cache_key = summary_cache.make_key(text, MODEL, PROMPT_VERSION)
+        cached = summary_cache.get(cache_key)
+        if cached:
+            summaries[article_id] = cached
+        else:
+            # custom_id must be short and alphanumeric, so article URIs are mapped to positions
+            pending[f"article-{len(pending)}"] = (article_id, cache_key, text)
+
+    if not pending:
+        return summaries
+
+    transport = transport or get_transport()
+    started = time.perf_counter()
+    batch_id = transport.create([
+        {'custom_id': custom_id, 'params': build_request(text)}
+        for custom_id, (_, _, text) in pending.items()
+    ])
+    logger.info(f"Submitted message batch {batch_id} with {len(pending)} articles")
+
+    poll_interval = current_app.config.get('CLAUDE_BATCH_POLL_INTERVAL', 30)
+    deadline = time.monotonic() + current_app.config.get('CLAUDE_BATCH_TIMEOUT', 24 * 3600)
+    while not transport.is_done(batch_id):
+        if time.monotonic() >= deadline:
+            logger.error(f"Message batch {batch_id} did not finish in time, cancelling")
+            transport.cancel(batch_id)
+            CLAUDE_REQUEST_SECONDS.labels('batch', 'timeout').observe(time.perf_counter() - started)
+            return summaries
+        time.sleep(poll_interval)
+
+    CLAUDE_REQUEST_SECONDS.labels('batch', 'ok').observe(time.perf_counter() - started)
+    for custom_id, text, error in transport.results(batch_id):
+        if custom_id not in pending:
+            continue
+        article_id, cache_key, _ = pending[custom_id]
+        if error or not text:
+            logger.error(f"Batch request for article {article_id} failed: {error}")
+            continue
+        if not validate_response_format(text):
+            logger.error(f"Batch summary for article {article_id} does not match required format")
+            continue
+        summary_cache.put(cache_key, MODEL, text)
+        summaries[article_id] = text
+
+    logger.info(f"Message batch {batch_id} produced {len(summaries)} summaries")
+    return summaries
@@ -0,0 +1,57 @@
+import logging
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+def normalize_url(url):
+    """Accept the postgres:// scheme many hosts hand out, which SQLAlchemy 2 no longer does"""
+    if url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+def engine_options(url, pool_size=5, max_overflow=10, pool_timeout=30, pool_recycle=1800):
+    """SQLAlchemy engine options for a database URL.
+
+    PostgreSQL gets a bounded pool whose connections are pinged before use and
+    recycled before server or proxy idle timeouts. SQLite is tuned per
+    connection by the connect listener below instead.
+    """
+    if url.startswith('postgresql'):
+        return {
+            'pool_pre_ping': True,
+            'pool_size': pool_size,
+            'max_overflow': max_overflow,
+            'pool_timeout': pool_timeout,
+            'pool_recycle': pool_recycle
+        }
+    return {}
+
+_sqlite_pragmas = {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'busy_timeout': 15000}
+
+SQLITE_JOURNAL_MODES = ('WAL', 'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY')
+SQLITE_SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+def configure_sqlite(journal_mode='WAL', synchronous='NORMAL', busy_timeout_ms=15000):
+    """Set the pragmas applied to every new SQLite connection"""
+    journal_mode, synchronous = journal_mode.upper(), synchronous.upper()
+    if journal_mode not in SQLITE_JOURNAL_MODES:
+        raise ValueError(f"Unknown SQLite journal mode: {journal_mode}")
+    if synchronous not in SQLITE_SYNCHRONOUS_MODES:
+        raise ValueError(f"Unknown SQLite synchronous mode: {synchronous}")
+    _sqlite_pragmas.update(journal_mode=journal_mode, synchronous=synchronous, busy_timeout=busy_timeout_ms)
+
+@event.listens_for(Engine, 'connect')
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets the feed keep reading while the job commits; NORMAL sync is durable enough in WAL mode
+    if type(dbapi_connection).__module__.split('.')[0] not in ('sqlite3', 'pysqlite2'):
+        return
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA busy_timeout = {int(_sqlite_pragmas['busy_timeout'])}")
+        cursor.execute(f"PRAGMA journal_mode = {_sqlite_pragmas['journal_mode']}")
+        cursor.execute(f"PRAGMA synchronous = {_sqlite_pragmas['synchronous']}")
+    except Exception as e:
+        logger.warning(f"Failed to apply SQLite pragmas: {str(e)}")
+    finally:
+        cursor.close()
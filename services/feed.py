@@ -0,0 +1,180 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import and_, or_, update
+from sqlalchemy.exc import IntegrityError
+from models import db, Article, FeedState, STAGE_PUBLISHED
+from services.metrics import FEED_PAGE_CACHE
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PER_PAGE = 10
+
+# Serialized pages keyed by (generation, kind, page or cursor) -> (etag, body); only the current generation is kept
+_pages = {}
+_generation = {'value': None, 'checked_at': 0.0}
+_lock = threading.Lock()
+
+def get_generation():
+    """Return the current feed generation, re-reading the DB at most every FEED_GENERATION_CHECK_SECONDS"""
+    check_interval = current_app.config.get('FEED_GENERATION_CHECK_SECONDS', 5)
+    now = time.monotonic()
+    if _generation['value'] is not None and now - _generation['checked_at'] < check_interval:
+        return _generation['value']
+
+    with _lock:
+        if _generation['value'] is not None and now - _generation['checked_at'] < check_interval:
+            return _generation['value']
+
+        state = db.session.get(FeedState, 1)
+        generation = state.generation if state else 0
+        if generation != _generation['value']:
+            _pages.clear()
+        _generation['value'] = generation
+        _generation['checked_at'] = now
+        return generation
+
+def bump_generation():
+    """Invalidate every cached page, here and in other processes, and return the new generation"""
+    # Atomic increment so overlapping job runs never lose a bump
+    bumped = db.session.execute(
+        update(FeedState)
+        .where(FeedState.id == 1)
+        .values(generation=FeedState.generation + 1, updated_at=datetime.utcnow())
+    )
+    if not bumped.rowcount:
+        db.session.add(FeedState(id=1, generation=1))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another process created the row first; bump that one instead
+        db.session.rollback()
+        return bump_generation()
+
+    generation = db.session.get(FeedState, 1, populate_existing=True).generation
+    with _lock:
+        _pages.clear()
+        _generation['value'] = generation
+        _generation['checked_at'] = time.monotonic()
+
+    logger.info(f"Feed generation bumped to {generation}")
+    return generation
+
+def serialize_article(article):
+    """Build the feed entry for a published article row"""
+    return {
+        'id': article.id,
+        'title': article.title,
+        'comic_header': article.comic_header,
+        'summary': article.comic_summary,
+        'images': article.image_urls,
+        'variants': article.image_variants or [],
+        'prompts': article.image_prompts
+    }
+
+# Only the columns the feed returns, read as plain rows without ORM objects
+FEED_COLUMNS = (
+    Article.id,
+    Article.title,
+    Article.comic_header,
+    Article.comic_summary,
+    Article.image_urls,
+    Article.image_prompts,
+    Article.image_variants,
+    Article.created_at
+)
+
+def encode_cursor(article):
+    return f"{article.created_at.strftime('%Y%m%d%H%M%S%f')}-{article.id}"
+
+def decode_cursor(cursor):
+    """Parse a cursor into (created_at, id); raises ValueError for malformed cursors"""
+    timestamp, _, article_id = cursor.partition('-')
+    return datetime.strptime(timestamp, '%Y%m%d%H%M%S%f'), int(article_id)
+
+def feed_query():
+    cutoff_time = datetime.utcnow() - timedelta(hours=24)
+    # Articles only reach the published stage with all four panels and prompts, so every row read is served
+    return Article.query\
+        .with_entities(*FEED_COLUMNS)\
+        .filter(Article.stage == STAGE_PUBLISHED)\
+        .filter(Article.created_at >= cutoff_time)\
+        .order_by(Article.created_at.desc(), Article.id.desc())
+
+def serialize_rows(rows):
+    return [serialize_article(article) for article in rows]
+
+def build_cursor_page(cursor=None):
+    """Serialize the page of articles that follows cursor, newest first"""
+    query = feed_query()
+    if cursor:
+        created_at, article_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            Article.created_at < created_at,
+            and_(Article.created_at == created_at, Article.id < article_id)
+        ))
+
+    rows = query.limit(PER_PAGE).all()
+
+    next_cursor = encode_cursor(rows[-1]) if len(rows) == PER_PAGE else None
+    return {"success": True, "articles": serialize_rows(rows), "next_cursor": next_cursor}
+
+def build_page(page):
+    """Serialize a numbered page; kept for clients that still paginate by page number"""
+    rows = feed_query().limit(PER_PAGE).offset((max(page, 1) - 1) * PER_PAGE).all()
+    return {"success": True, "articles": serialize_rows(rows)}
+
+def _materialize(generation, key, payload):
+    body = json.dumps(payload).encode('utf-8')
+    etag = hashlib.sha1(body).hexdigest()
+    entry = (etag, body)
+    with _lock:
+        # A concurrent bump may have moved on; never cache a page under a stale generation
+        if _generation['value'] == generation:
+            if len(_pages) >= current_app.config.get('FEED_CACHE_MAX_PAGES', 256):
+                _pages.clear()
+            _pages[key] = entry
+    return entry
+
+def get_page(page):
+    """Return (etag, body) for a numbered feed page, serializing it at most once per generation"""
+    generation = get_generation()
+    key = (generation, 'page', page)
+    cached = _pages.get(key)
+    if cached:
+        FEED_PAGE_CACHE.labels('hit').inc()
+        return cached
+
+    FEED_PAGE_CACHE.labels('miss').inc()
+
+    return _materialize(generation, key, build_page(page))
+
+def get_cursor_page(cursor=None):
+    """Return (etag, body) for the feed page after cursor, serializing it at most once per generation"""
+    generation = get_generation()
+    key = (generation, 'cursor', cursor)
+    cached = _pages.get(key)
+    if cached:
+        FEED_PAGE_CACHE.labels('hit').inc()
+        return cached
+
+    FEED_PAGE_CACHE.labels('miss').inc()
+
+    return _materialize(generation, key, build_cursor_page(cursor))
+
+def warm_pages(count=None):
+    """Materialize the first pages for the current generation so readers hit the cache"""
+    count = count or current_app.config.get('FEED_WARM_PAGES', 3)
+    generation = get_generation()
+    cursor = None
+    for _ in range(count):
+        payload = build_cursor_page(cursor)
+        _materialize(generation, (generation, 'cursor', cursor), payload)
+        cursor = payload['next_cursor']
+        if not cursor:
+            break
@@ -0,0 +1,180 @@
+import json
+import logging
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, func, insert
+from models import db, Article, FeedEvent, STAGE_PUBLISHED
+from services.feed import FEED_COLUMNS, serialize_article
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def record_published(article_ids):
+    """Add a feed event per newly published article, inside the caller's transaction"""
+    if article_ids:
+        db.session.execute(insert(FeedEvent.__table__), [{'article_id': article_id} for article_id in article_ids])
+
+def latest_event_id():
+    return db.session.query(func.max(FeedEvent.id)).scalar() or 0
+
+def fetch_events(after_id, limit=100):
+    """Return ([(event id, feed entry)], last event id read) for up to limit events after after_id.
+
+    Only events whose article is still published get an entry, but the last
+    id covers every event read, so callers page on from there.
+    """
+    events = FeedEvent.query\
+        .filter(FeedEvent.id > after_id)\
+        .order_by(FeedEvent.id)\
+        .limit(limit)\
+        .all()
+    if not events:
+        return [], after_id
+
+    articles = {
+        article.id: article for article in Article.query
+        .with_entities(*FEED_COLUMNS)
+        .filter(Article.id.in_({event.article_id for event in events}))
+        .filter(Article.stage == STAGE_PUBLISHED)
+    }
+    entries = [
+        (event.id, serialize_article(articles[event.article_id]))
+        for event in events if event.article_id in articles
+    ]
+    return entries, events[-1].id
+
+def fetch_events_since(after_id, limit=100):
+    """Every published entry after after_id, read limit events at a time until caught up"""
+    entries = []
+    while True:
+        page, last_id = fetch_events(after_id, limit)
+        entries.extend(page)
+        if last_id == after_id:
+            return entries, last_id
+        after_id = last_id
+
+def prune_events():
+    """Delete events older than the feed window; returns the number removed"""
+    cutoff_time = datetime.utcnow() - timedelta(hours=current_app.config.get('RETENTION_HOURS', 24))
+    removed = db.session.execute(delete(FeedEvent).where(FeedEvent.created_at < cutoff_time)).rowcount
+    db.session.commit()
+    return removed
+
+def format_event(event_id, entry):
+    return f"id: {event_id}\nevent: article\ndata: {json.dumps(entry)}\n\n"
+
+class TooManyStreams(Exception):
+    """Every stream slot of this process is taken; the client should poll instead"""
+
+class FeedEventBroadcaster:
+    """Polls FeedEvent once per process and fans new entries out to every connected stream.
+
+    The poller thread only runs while at least one client is subscribed, so
+    the DB cost is one small query per FEED_EVENT_POLL_SECONDS however many
+    readers are connected.
+    """
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._last_id = None
+
+    def subscribe(self, app):
+        """Register a stream; called in a request so a new poller starts from the events that exist now.
+
+        Raises TooManyStreams once FEED_EVENT_MAX_STREAMS streams are open in this process.
+        """
+        subscriber = queue.Queue(maxsize=app.config.get('FEED_EVENT_QUEUE_SIZE', 100))
+        max_streams = app.config.get('FEED_EVENT_MAX_STREAMS', 16)
+        with self._lock:
+            if len(self._subscribers) >= max_streams:
+                raise TooManyStreams(f"{len(self._subscribers)} feed streams already open")
+            self._subscribers.add(subscriber)
+            if self._thread is None:
+                self._last_id = latest_event_id()
+                self._thread = threading.Thread(target=self._poll, args=(app,), name='feed-events', daemon=True)
+                self._thread.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def _publish(self, event_id, entry):
+        message = (event_id, format_event(event_id, entry))
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                # A stalled client is dropped; it reconnects with Last-Event-ID and replays from the DB
+                self.unsubscribe(subscriber)
+                with subscriber.mutex:
+                    subscriber.queue.clear()
+                subscriber.put_nowait(None)
+
+    def _poll(self, app):
+        interval = app.config.get('FEED_EVENT_POLL_SECONDS', 2)
+        while True:
+            try:
+                with app.app_context():
+                    entries, last_id = fetch_events_since(self._last_id)
+                for event_id, entry in entries:
+                    self._publish(event_id, entry)
+                self._last_id = last_id
+            except Exception as e:
+                logger.error(f"Failed to poll feed events: {str(e)}")
+
+            time.sleep(interval)
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+
+broadcaster = FeedEventBroadcaster()
+
+def stream_events(app, last_event_id=None):
+    """Generator of SSE messages: missed events after last_event_id first, then live ones.
+
+    The replay is read before the response starts, so the generator itself
+    never touches the DB session. Each open stream holds a server thread for
+    as long as the reader stays connected, so at most FEED_EVENT_MAX_STREAMS
+    are served per process; past that TooManyStreams is raised.
+    """
+    subscriber = broadcaster.subscribe(app)
+    try:
+        replay = fetch_events_since(last_event_id)[0] if last_event_id is not None else []
+    except Exception:
+        broadcaster.unsubscribe(subscriber)
+        raise
+    heartbeat = app.config.get('FEED_EVENT_HEARTBEAT_SECONDS', 15)
+
+    def generate():
+        try:
+            yield f"retry: {app.config.get('FEED_EVENT_RETRY_MS', 5000)}\n\n"
+            replayed = 0
+            for event_id, entry in replay:
+                replayed = event_id
+                yield format_event(event_id, entry)
+            while True:
+                try:
+                    message = subscriber.get(timeout=heartbeat)
+                except queue.Empty:
+                    # Comment lines keep proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+                    continue
+                if message is None:
+                    return
+                event_id, text = message
+                # Events read by the replay may also arrive live; send each once
+                if event_id > replayed:
+                    yield text
+        finally:
+            broadcaster.unsubscribe(subscriber)
+
+    return generate()
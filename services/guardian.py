@@ -2,6 +2,7 @@ import requests
 import logging
 from flask import current_app
 from models import db, Article
+from services import source_client
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -10,22 +11,26 @@ def validate_api_key(api_key):
     if not api_key or api_key == "test":
         raise ValueError("Guardian API key is not configured")
 
-def get_news(page=1):
+def get_news(page=1, page_size=10):
     api_key = current_app.config['GUARDIAN_API_KEY']
     
     try:
         validate_api_key(api_key)
         
-        base_url = "https://content.guardianapis.com/search"
+        base_url = current_app.config.get('GUARDIAN_API_URL', "https://content.guardianapis.com/search")
         params = {
             'api-key': api_key,
             'page': page,
             'show-fields': 'bodyText',
-            'page-size': 10
+            'page-size': page_size,
+            'order-by': 'newest'
         }
         
-        logger.info(f"Fetching news articles from Guardian API - page {page}")
-        response = requests.get(base_url, params=params)
+        logger.debug(f"Fetching news articles from Guardian API - page {page}")
+        response = source_client.get(base_url, params=params)
+        if response is None:
+            logger.info(f"Guardian page {page} unchanged since last fetch")
+            return []
         
         if response.status_code == 401:
             raise ValueError("Invalid Guardian API key")
@@ -57,3 +62,31 @@ def get_news(page=1):
     except Exception as e:
         logger.error(f"Unexpected error in get_news: {str(e)}")
         raise Exception(f"Failed to fetch news: {str(e)}")
+
+def iter_news_pages(find_known_ids, max_pages=5, page_size=10):
+    """Stream Guardian results newest first, page by page, until reaching stories already stored.
+
+    find_known_ids takes a list of article ids and returns the subset already
+    in the database. Paging stops at the first page containing a known story,
+    a short page, or max_pages, so a caught-up feed costs a single request.
+    """
+    for page in range(1, max_pages + 1):
+        try:
+            articles = get_news(page=page, page_size=page_size)
+        except Exception as e:
+            if page == 1:
+                raise
+            logger.warning(f"Stopping Guardian paging at page {page}: {str(e)}")
+            return
+
+        if not articles:
+            return
+
+        known = find_known_ids([article['id'] for article in articles])
+        new_articles = [article for article in articles if article['id'] not in known]
+        if new_articles:
+            yield new_articles
+
+        if known or len(articles) < page_size:
+            logger.info(f"Guardian paging caught up at page {page}")
+            return
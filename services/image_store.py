@@ -0,0 +1,105 @@
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import time
+import requests
+from flask import current_app
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+URL_PREFIX = "/images/"
+DIGEST_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+# Stored files are <digest>.webp and its resized variants <digest>-<width>w.webp
+STORED_NAME_PATTERN = re.compile(r'^[0-9a-f]{64}(-[0-9]+w)?$')
+CHUNK_SIZE = 64 * 1024
+
+def get_store_dir():
+    store_dir = current_app.config.get('IMAGE_STORE_DIR') or os.path.join(current_app.instance_path, 'images')
+    os.makedirs(store_dir, exist_ok=True)
+    return store_dir
+
+def local_url(digest):
+    return f"{URL_PREFIX}{digest}.webp"
+
+def digest_from_url(url):
+    """Return the content digest of a local image URL, or None for remote URLs"""
+    if not isinstance(url, str) or not url.startswith(URL_PREFIX) or not url.endswith('.webp'):
+        return None
+    digest = url[len(URL_PREFIX):-len('.webp')]
+    return digest if DIGEST_PATTERN.match(digest) else None
+
+def mirror_image(url):
+    """Stream a remote image into the content-addressed store and return its local URL.
+
+    Falls back to the original URL if the download fails, so a panel is never lost.
+    """
+    if digest_from_url(url):
+        return url
+
+    store_dir = get_store_dir()
+    timeout = current_app.config.get('IMAGE_MIRROR_TIMEOUT', 30)
+    tmp_path = None
+
+    try:
+        with requests.get(url, stream=True, timeout=timeout) as response:
+            response.raise_for_status()
+            digest = hashlib.sha256()
+            with tempfile.NamedTemporaryFile(dir=store_dir, suffix='.part', delete=False) as tmp:
+                tmp_path = tmp.name
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    digest.update(chunk)
+                    tmp.write(chunk)
+
+        digest = digest.hexdigest()
+        final_path = os.path.join(store_dir, f"{digest}.webp")
+        if os.path.exists(final_path):
+            os.remove(tmp_path)
+            os.utime(final_path)
+        else:
+            os.replace(tmp_path, final_path)
+        return local_url(digest)
+
+    except Exception as e:
+        logger.error(f"Failed to mirror image {url}: {str(e)}")
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return url
+
+def mirror_images(image_urls):
+    """Mirror a list of image URLs, returning the rewritten list"""
+    from services.replicate import DEFAULT_IMAGE_URL
+
+    return [url if url == DEFAULT_IMAGE_URL else mirror_image(url) for url in image_urls or []]
+
+def collect_garbage(referenced_urls):
+    """Delete stored images, and their resized variants, that no article references any more.
+
+    Files newer than IMAGE_STORE_GC_GRACE_SECONDS are kept, because they may
+    belong to an article that is still being processed and not yet committed.
+    """
+    store_dir = get_store_dir()
+    referenced = {digest_from_url(url) for url in referenced_urls}
+    grace = current_app.config.get('IMAGE_STORE_GC_GRACE_SECONDS', 3600)
+    now = time.time()
+    removed = 0
+
+    for name in os.listdir(store_dir):
+        path = os.path.join(store_dir, name)
+        stem, ext = os.path.splitext(name)
+        if stem.split('-')[0] in referenced:
+            continue
+        try:
+            if now - os.path.getmtime(path) < grace:
+                continue
+            if ext in ('.webp', '.part'):
+                os.remove(path)
+                removed += 1
+        except OSError as e:
+            logger.warning(f"Failed to remove stored image {name}: {str(e)}")
+
+    if removed:
+        logger.info(f"Removed {removed} unreferenced images from the image store")
+    return removed
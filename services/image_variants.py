@@ -0,0 +1,129 @@
+"""Responsive variants of mirrored panels, built in a process pool.
+
+Each stored panel <digest>.webp gets downscaled copies <digest>-<width>w.webp
+next to it for srcset, plus a tiny blurred placeholder inlined as a data URI
+so the grid has something to paint before any panel has downloaded. Resizing
+and WebP encoding are CPU bound, so they run in worker processes instead of
+the job's threads.
+"""
+import base64
+import io
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app
+from PIL import Image, ImageFilter
+from services.image_store import URL_PREFIX, digest_from_url, get_store_dir
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def variant_name(digest, width):
+    return f"{digest}-{width}w.webp"
+
+def _save_webp(image, path, quality):
+    # Write to a temporary file first so a concurrent reader never sees a partial image
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix='.part', delete=False) as tmp:
+        image.save(tmp, 'WEBP', quality=quality)
+    os.replace(tmp.name, path)
+
+def build_variants(store_dir, digest, widths, quality, placeholder_width):
+    """Create the variants of one stored panel; runs in a pool worker.
+
+    Returns {'width', 'height', 'srcset': [[url, width], ...], 'placeholder'},
+    where srcset lists the variants narrower than the original and then the
+    original itself.
+    """
+    with Image.open(os.path.join(store_dir, f"{digest}.webp")) as image:
+        image.load()
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGB')
+        width, height = image.size
+
+        srcset = []
+        for target in sorted(set(widths)):
+            if target >= width:
+                continue
+            path = os.path.join(store_dir, variant_name(digest, target))
+            if not os.path.exists(path):
+                resized = image.resize((target, max(1, round(height * target / width))), Image.LANCZOS, reducing_gap=2.0)
+                _save_webp(resized, path, quality)
+            srcset.append([f"{URL_PREFIX}{variant_name(digest, target)}", target])
+        srcset.append([f"{URL_PREFIX}{digest}.webp", width])
+
+        thumbnail = image.resize((placeholder_width, max(1, round(height * placeholder_width / width))), Image.BILINEAR)
+        buffer = io.BytesIO()
+        thumbnail.filter(ImageFilter.GaussianBlur(1)).save(buffer, 'WEBP', quality=30)
+
+    return {
+        'width': width,
+        'height': height,
+        'srcset': srcset,
+        'placeholder': 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii')
+    }
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool(max_workers):
+    """The process-wide variant pool, started on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # The pool is started from an article thread while the scheduler, the lease heartbeat and
+            # other articles hold locks; forking here could copy a held lock into the children
+            _pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('forkserver'))
+        return _pool
+
+def reset_pool(pool):
+    """Discard a broken pool so the next article starts a fresh one"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def render_variants(image_urls):
+    """Build variants for every locally stored panel of an article.
+
+    Returns one entry per URL, None for panels that are not in the local
+    store or whose variants failed; the frontend then uses the URL as is.
+    """
+    config = current_app.config
+    store_dir = get_store_dir()
+    widths = config.get('IMAGE_VARIANT_WIDTHS') or [320, 640, 960]
+    timeout = config.get('IMAGE_VARIANT_TIMEOUT', 60)
+
+    variants = [None] * len(image_urls or [])
+    pool = get_pool(config.get('IMAGE_VARIANT_WORKERS') or os.cpu_count() or 1)
+    try:
+        futures = {
+            pool.submit(
+                build_variants, store_dir, digest, widths,
+                config.get('IMAGE_VARIANT_QUALITY', 70), config.get('IMAGE_PLACEHOLDER_WIDTH', 16)
+            ): idx
+            for idx, digest in enumerate(digest_from_url(url) for url in image_urls or [])
+            if digest
+        }
+    except BrokenProcessPool as e:
+        logger.error(f"Image variant pool is broken, restarting it: {str(e)}")
+        reset_pool(pool)
+        return variants
+
+    done, not_done = wait(futures, timeout=timeout)
+    for future in not_done:
+        future.cancel()
+        logger.warning(f"Variants for panel {futures[future] + 1} timed out after {timeout}s")
+    for future in done:
+        try:
+            variants[futures[future]] = future.result()
+        except BrokenProcessPool as e:
+            logger.error(f"Image variant pool is broken, restarting it: {str(e)}")
+            reset_pool(pool)
+        except Exception as e:
+            logger.error(f"Failed to build variants for panel {futures[future] + 1}: {str(e)}")
+    return variants
@@ -1,141 +1,641 @@
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from models import db, Article
-from services.guardian import get_news as get_guardian_news
+from flask import current_app
+from sqlalchemy import case
+from models import (
+    db, Article, ArticleBody, RefreshRun, RESUMABLE_STAGES, STAGE_FETCHED, STAGE_SUMMARIZED,
+    STAGE_IMAGES_PENDING, STAGE_IMAGES_DONE, STAGE_PUBLISHED, STAGE_FAILED, STAGE_DUPLICATE
+)
+from services.guardian import iter_news_pages as iter_guardian_news_pages
 from services.nytimes import get_news as get_nytimes_news
-from services.claude import get_comic_summary
-from services.replicate import generate_images
+from services.claude import get_comic_summary, parse_response
+from services.claude_batch import summarize_batch
+from services.replicate import PanelRenderer, DEFAULT_IMAGE_URL
+from services.image_store import mirror_images, collect_garbage
+from services.image_variants import render_variants
+from services.feed import bump_generation, warm_pages
+from services.feed_events import record_published, prune_events
+from services.retention import sweep_expired_articles
+from services.lease import hold_lease
+from services import source_client
+from services.refresh import RunProgress, claim_run, JOB_LEASE_NAME
+from services.similarity import simhash, find_near_duplicate
+from services.throttle import get_limiter, Unlimited
+from services.metrics import SOURCE_FETCH_SECONDS, SOURCE_ARTICLES, ARTICLES_SKIPPED, ARTICLE_STAGES
 import json
-import re
 
 logger = logging.getLogger(__name__)
 
-def fetch_and_process_articles():
-    """Background job to fetch and process articles"""
-    from app import app  # Import app at function level
-    
-    def process_article(article_data, source):
-        """Process a single article and save to database"""
+def insert_ignoring_duplicates(table, key='source_id'):
+    """INSERT that skips rows whose unique key already exists, for the active dialect"""
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table).on_conflict_do_nothing(index_elements=[key])
+
+def find_existing_source_ids(source_ids):
+    """Return the subset of source_ids already stored, using one query per chunk"""
+    existing = set()
+    source_ids = list(source_ids)
+    for start in range(0, len(source_ids), 500):
+        chunk = source_ids[start:start + 500]
+        existing.update(
+            source_id for (source_id,) in
+            db.session.query(Article.source_id).filter(Article.source_id.in_(chunk))
+        )
+    return existing
+
+def save_articles(rows, batch_size=100, texts=None):
+    """Bulk upsert fetched article rows in a single transaction; returns the number inserted.
+
+    texts maps source_id to story text, stored compressed in ArticleBody in the same transaction.
+    Raises if the transaction fails, after rolling it back.
+    """
+    if not rows:
+        return 0
+
+    inserted = 0
+    try:
+        for start in range(0, len(rows), batch_size):
+            result = db.session.execute(insert_ignoring_duplicates(Article.__table__), rows[start:start + batch_size])
+            inserted += max(result.rowcount or 0, 0)
+
+        if texts:
+            source_ids = list(texts)
+            bodies = []
+            for start in range(0, len(source_ids), 500):
+                bodies.extend(
+                    {'article_id': article_id, 'content': ArticleBody.compress(texts[source_id])}
+                    for article_id, source_id in db.session.query(Article.id, Article.source_id)
+                    .filter(Article.source_id.in_(source_ids[start:start + 500]))
+                )
+            for start in range(0, len(bodies), batch_size):
+                db.session.execute(
+                    insert_ignoring_duplicates(ArticleBody.__table__, key='article_id'),
+                    bodies[start:start + batch_size]
+                )
+        db.session.commit()
+    except Exception as e:
+        logger.error(f"Failed to save {len(rows)} articles: {str(e)}")
+        db.session.rollback()
+        raise
+
+    skipped = len(rows) - inserted
+    logger.info(f"Saved {inserted} articles" + (f", {skipped} already existed" if skipped else ""))
+    return inserted
+
+def merge_near_duplicates(source_ids, max_distance):
+    """Mark newly stored stories that repeat a story from the last 24 hours as duplicates of it.
+
+    Each new story is compared with every fingerprinted story in the window
+    that is not itself a duplicate or failed, and with the new stories before
+    it, so the same event from two sources in one run is rendered once.
+    Returns the number of stories merged.
+    """
+    new_rows = []
+    for start in range(0, len(source_ids), 500):
+        new_rows.extend(
+            db.session.query(Article.id, Article.simhash)
+            .filter(Article.source_id.in_(source_ids[start:start + 500]), Article.stage == STAGE_FETCHED)
+        )
+    new_rows.sort()
+    new_ids = {article_id for article_id, _ in new_rows}
+
+    cutoff_time = datetime.utcnow() - timedelta(hours=24)
+    candidates = [
+        (article_id, fingerprint) for article_id, fingerprint in db.session.query(Article.id, Article.simhash)
+        .filter(Article.created_at >= cutoff_time, Article.simhash.isnot(None))
+        .filter(Article.stage.notin_((STAGE_DUPLICATE, STAGE_FAILED)))
+        if article_id not in new_ids
+    ]
+
+    merged = 0
+    for article_id, fingerprint in new_rows:
+        original_id = find_near_duplicate(fingerprint, candidates, max_distance)
+        if original_id is None:
+            candidates.append((article_id, fingerprint))
+            continue
+        Article.query.filter_by(id=article_id).update(
+            {'stage': STAGE_DUPLICATE, 'duplicate_of': original_id, 'updated_at': datetime.utcnow()},
+            synchronize_session=False
+        )
+        merged += 1
+    db.session.commit()
+
+    if merged:
+        ARTICLES_SKIPPED.labels('near_duplicate').inc(merged)
+        logger.info(f"Merged {merged} near-duplicate stories into stories already stored")
+    return merged
+
+class LeaseLost(Exception):
+    """Another runner took over the job lease; this run stops instead of working alongside it"""
+
+class StageError(Exception):
+    """A pipeline stage failed for one article; the article keeps its stage and is retried"""
+
+def record_stage(article_id, stage, **values):
+    """Persist an article's move to stage together with the output of the stage it finished"""
+    values.update(stage=stage, stage_attempts=0, last_error=None, updated_at=datetime.utcnow())
+    Article.query.filter_by(id=article_id).update(values, synchronize_session=False)
+    db.session.commit()
+    ARTICLE_STAGES.labels(stage).inc()
+
+def record_failure(article_id, error, max_attempts):
+    """Count a failed try of the article's current stage, giving up after max_attempts"""
+    Article.query.filter_by(id=article_id).update({
+        'stage_attempts': Article.stage_attempts + 1,
+        'stage': case((Article.stage_attempts + 1 >= max_attempts, STAGE_FAILED), else_=Article.stage),
+        'last_error': error[:2000],
+        'updated_at': datetime.utcnow()
+    }, synchronize_session=False)
+    db.session.commit()
+    ARTICLE_STAGES.labels('error').inc()
+    try:
+        release_duplicates([article_id])
+    except Exception as e:
+        # The next run's process_articles retries the release
+        logger.error(f"Failed to release duplicates of article {article_id}: {str(e)}")
+        db.session.rollback()
+
+def release_duplicates(original_ids=None):
+    """Give the stories merged into failed originals back to their duplicates.
+
+    The earliest duplicate of each failed original returns to the fetched
+    stage and is rendered on the next run; the others become its duplicates.
+    Without original_ids every failed original is checked. Returns the number
+    of stories released.
+    """
+    failed = db.session.query(Article.id).filter(Article.stage == STAGE_FAILED)
+    if original_ids is not None:
+        failed = failed.filter(Article.id.in_(original_ids))
+    duplicates = db.session.query(Article.id, Article.duplicate_of)\
+        .filter(Article.stage == STAGE_DUPLICATE, Article.duplicate_of.in_(failed.scalar_subquery()))\
+        .order_by(Article.id)\
+        .all()
+    if not duplicates:
+        return 0
+
+    now = datetime.utcnow()
+    heirs = {}
+    for article_id, original_id in duplicates:
+        if original_id in heirs:
+            values = {'duplicate_of': heirs[original_id], 'updated_at': now}
+        else:
+            heirs[original_id] = article_id
+            values = {'stage': STAGE_FETCHED, 'duplicate_of': None, 'stage_attempts': 0, 'last_error': None, 'updated_at': now}
+        Article.query.filter_by(id=article_id).update(values, synchronize_session=False)
+    db.session.commit()
+    logger.info(f"Released {len(heirs)} stories whose original failed back to the fetched stage")
+    return len(heirs)
+
+def publish_finished_articles():
+    """Publish every article whose panels are done, with a feed event for each so open streams push them"""
+    article_ids = [article_id for (article_id,) in db.session.query(Article.id)
+                   .filter(Article.stage == STAGE_IMAGES_DONE)
+                   .order_by(Article.created_at, Article.id)]
+    if not article_ids:
+        return 0
+
+    published = Article.query\
+        .filter(Article.id.in_(article_ids), Article.stage == STAGE_IMAGES_DONE)\
+        .update({'stage': STAGE_PUBLISHED, 'updated_at': datetime.utcnow()}, synchronize_session=False)
+    record_published(article_ids)
+    db.session.commit()
+    ARTICLE_STAGES.labels(STAGE_PUBLISHED).inc(published)
+    return published
+
+def get_stage_limits(config):
+    """Per-stage provider limiters for the configured pipeline mode.
+
+    Each stage holds a slot of its provider's adaptive concurrency limit
+    (see services/throttle.py); waiting articles get slots in priority order.
+    """
+    if config.get('PIPELINE_MODE', 'concurrent') == 'sequential':
+        return {'summary': Unlimited(), 'images': Unlimited()}
+
+    return {'summary': get_limiter('claude', config), 'images': get_limiter('replicate', config)}
+
+def processing_priority(article):
+    """Top-ranked stories first, then the oldest; stories without a rank go last"""
+    rank = article.source_rank
+    return (1 if rank is None else 0, rank or 0, article.id)
+
+def fetch_guardian_articles(config):
+    """All Guardian stories newer than the ones already stored"""
+    articles = []
+    for page in iter_guardian_news_pages(
+        find_existing_source_ids,
+        max_pages=config.get('GUARDIAN_MAX_PAGES', 5),
+        page_size=config.get('GUARDIAN_PAGE_SIZE', 10)
+    ):
+        articles.extend(page)
+    return articles
+
+SOURCE_FETCHERS = {
+    'nytimes': lambda config: get_nytimes_news(),
+    'guardian': fetch_guardian_articles
+}
+
+def process_refresh_queue(app=None):
+    """Scheduler job: start the pipeline for a refresh queued through /api/refresh"""
+    app = app or current_app._get_current_object()
+
+    with app.app_context():
+        queued = RefreshRun.query.filter_by(status='queued').order_by(RefreshRun.id).first()
+        run_id = queued.id if queued else None
+
+    if run_id:
+        fetch_and_process_articles(run_id=run_id, app=app)
+
+def fetch_and_process_articles(run_id=None, app=None):
+    """Background job to fetch articles and move every unfinished article through its stages.
+
+    Each stage persists its output before the next one starts, so a failure
+    or crash resumes from the last completed stage on the next run instead of
+    paying for Claude or Replicate again.
+    """
+    # The scheduler passes the app it runs in; direct callers may rely on an app context instead
+    app = app or current_app._get_current_object()
+    # Set by the lease heartbeat once another runner may hold the lease
+    lease_lost = threading.Event()
+
+    def check_lease():
+        if lease_lost.is_set():
+            raise LeaseLost(f"Lost lease {JOB_LEASE_NAME}, stopping this run")
+
+    max_attempts = app.config.get('STAGE_MAX_ATTEMPTS', 3)
+
+    def summarize(article, limits):
+        """fetched -> summarized; with streaming, returns the renderer whose panels are already in flight"""
+        renderer = None
+        if app.config.get('CLAUDE_STREAMING', True):
+            # Start each panel as soon as its prompt closes. The Claude slot comes first, so articles
+            # queued for a throttled Claude never pin image slots; render_panels only ever holds the
+            # images slot, so taking both here cannot deadlock.
+            priority = processing_priority(article)
+            with limits['summary'].slot(priority), limits['images'].slot(priority):
+                renderer = PanelRenderer()
+
+                def on_tag(tag, content):
+                    renderer.on_tag(tag, content)
+
+                def on_retry():
+                    # The retried stream may write different prompts; panels must match the stored ones
+                    nonlocal renderer
+                    renderer.cancel()
+                    renderer = PanelRenderer()
+
+                try:
+                    summary = get_comic_summary(article.original_text, on_tag=on_tag, on_retry=on_retry)
+                except Exception:
+                    renderer.cancel()
+                    raise
+        else:
+            with limits['summary'].slot(processing_priority(article)):
+                summary = get_comic_summary(article.original_text)
+
+        store_summary(article.id, summary)
+        return renderer
+
+    def store_summary(article_id, summary):
+        sections = parse_response(summary)
+        comic_header = sections.get('comic_header')
+        comic_summary = sections.get('summary')
+        if not comic_header or not comic_summary:
+            raise StageError("Failed to extract comic_header or summary")
+
+        record_stage(
+            article_id,
+            STAGE_SUMMARIZED,
+            raw_summary=summary,
+            comic_header=comic_header,
+            comic_summary=comic_summary,
+            image_prompts=[sections.get(f'image_prompt{i}') for i in range(1, 5)]
+        )
+
+    def render_panels(article, limits, renderer=None):
+        """summarized/images_pending -> images_done"""
+        prompts = article.image_prompts or []
+        record_stage(article.id, STAGE_IMAGES_PENDING)
+
+        # Panels a streamed summary already started go ahead of articles that have none in flight
+        priority = (-1, 0, article.id) if renderer else processing_priority(article)
+        with limits['images'].slot(priority):
+            renderer = renderer or PanelRenderer()
+            image_urls, image_prompts = (json.loads(value) for value in renderer.finish(prompts))
+
+        if renderer.enabled and all(url == DEFAULT_IMAGE_URL for url in image_urls):
+            raise StageError("All panels failed to generate")
+
+        # Serve panels locally instead of hot-linking expiring Replicate URLs
+        image_variants = None
+        if app.config.get('IMAGE_MIRROR_ENABLED', True):
+            image_urls = mirror_images(image_urls)
+            if app.config.get('IMAGE_VARIANTS_ENABLED', True):
+                image_variants = render_variants(image_urls)
+
+        record_stage(
+            article.id,
+            STAGE_IMAGES_DONE,
+            image_urls=image_urls,
+            image_prompts=image_prompts,
+            image_variants=image_variants
+        )
+
+    def process_article(article_id, limits):
+        """Advance one article from its last completed stage; returns the stage it ends in"""
+        article = db.session.get(Article, article_id)
+        if not article or article.stage not in RESUMABLE_STAGES:
+            return article.stage if article else None
+
         try:
-            if not article_data or not isinstance(article_data, dict):
-                logger.error("Invalid article data received")
-                return
+            renderer = None
+            if article.stage == STAGE_FETCHED:
+                renderer = summarize(article, limits)
+                db.session.refresh(article)
 
-            # Check if article already exists
-            existing = Article.query.filter_by(source_id=article_data['id'], source=source).first()
-            if existing:
-                logger.info(f"Article {article_data['id']} from {source} already exists, skipping")
-                return
-            
-            # Generate comic summary
-            summary = get_comic_summary(article_data['text'])
-            if not summary:
-                logger.error(f"Failed to generate summary for article {article_data['id']}")
-                return
+            if article.stage in (STAGE_SUMMARIZED, STAGE_IMAGES_PENDING):
+                render_panels(article, limits, renderer)
+                db.session.refresh(article)
 
-            # Extract comic_header and summary using regex
-            comic_header = None
-            comic_summary = None
+            logger.debug(f"Article {article.source_id} from {article.source} is {article.stage}")
+            return article.stage
 
-            comic_header_match = re.search(r'<comic_header>(.*?)</comic_header>', summary, re.DOTALL)
-            if comic_header_match:
-                comic_header = comic_header_match.group(1).strip()
+        except Exception as e:
+            logger.error(f"Failed to process article {article.source_id} at stage {article.stage}: {str(e)}")
+            db.session.rollback()
+            try:
+                record_failure(article_id, str(e), max_attempts)
+            except Exception as record_error:
+                logger.error(f"Failed to record failure for article {article_id}: {str(record_error)}")
+                db.session.rollback()
+            return STAGE_FAILED
 
-            summary_match = re.search(r'<summary>(.*?)</summary>', summary, re.DOTALL)
-            if summary_match:
-                comic_summary = summary_match.group(1).strip()
+    def process_article_in_worker(article_id, limits):
+        """Process an article on a pool thread with its own app context and DB session"""
+        if lease_lost.is_set():
+            return None
+        with app.app_context():
+            return process_article(article_id, limits)
 
-            if not comic_header or not comic_summary:
-                logger.error(f"Failed to extract comic_header or summary for article {article_data['id']}")
-                return
-            
-            # Generate images and ensure proper JSON handling
-            image_urls, image_prompts = generate_images(summary)
-            
-            # Parse and validate image URLs and prompts
+    def summarize_in_batch(article_ids, progress):
+        """Batch mode: summarize every fetched article with one message batch before rendering panels"""
+        progress.set_stage('summarizing')
+        articles = Article.query\
+            .filter(Article.id.in_(article_ids), Article.stage == STAGE_FETCHED)\
+            .all()
+        if not articles:
+            return
+
+        try:
+            summaries = summarize_batch({article.id: article.original_text for article in articles})
+        except Exception as e:
+            logger.error(f"Batch summarization failed: {str(e)}")
+            summaries = {}
+
+        for article in articles:
             try:
-                image_urls_list = json.loads(image_urls) if isinstance(image_urls, str) else []
-                prompts_list = json.loads(image_prompts) if isinstance(image_prompts, str) else []
-                
-                if not isinstance(image_urls_list, list):
-                    image_urls_list = []
-                if not isinstance(prompts_list, list):
-                    prompts_list = []
-                
-                # Re-serialize as valid JSON strings
-                image_urls_json = json.dumps(image_urls_list)
-                prompts_json = json.dumps(prompts_list)
-                
-            except (json.JSONDecodeError, TypeError) as e:
-                logger.error(f"JSON processing error for article {article_data['id']}: {str(e)}")
-                image_urls_json = json.dumps([])
-                prompts_json = json.dumps([])
-            
-            # Create article with extracted values
-            article = Article(
-                source_id=article_data['id'],
-                source=source,
-                title=article_data['title'],
-                original_text=article_data['text'],
-                comic_header=comic_header,  # Store extracted comic_header
-                comic_summary=comic_summary,  # Store extracted summary
-                image_urls=image_urls_json,
-                image_prompts=prompts_json
-            )
-            
-            db.session.add(article)
-            db.session.commit()
-            logger.info(f"Successfully processed and saved article: {article_data['id']} from {source}")
-            
+                if article.id not in summaries:
+                    raise StageError("No valid summary in the message batch")
+                store_summary(article.id, summaries[article.id])
+            except Exception as e:
+                db.session.rollback()
+                record_failure(article.id, str(e), max_attempts)
+                progress.add('failed')
+
+        if len(summaries) < len(articles):
+            logger.warning(f"{len(articles) - len(summaries)} articles got no summary from the message batch")
+        progress.set_stage('processing')
+
+    def fetch_source(source):
+        """Fetch one source inside its own app context; returns (articles, HTTP validators of its responses)"""
+        with app.app_context():
+            fetcher = SOURCE_FETCHERS.get(source)
+            if not fetcher:
+                logger.error(f"Unknown news source: {source}")
+                return [], {}
+            try:
+                with SOURCE_FETCH_SECONDS.labels(source).time():
+                    articles = fetcher(app.config) or []
+            finally:
+                validators = source_client.take_validators()
+            # A source that returned nothing may have failed after a 200; fetch it in full next time
+            return articles, validators if articles else {}
+
+    def fetch_all_sources(sources):
+        """Fetch every configured source concurrently.
+
+        Returns (source, article) pairs in source order and the validators to
+        save once those articles are stored.
+        """
+        items, validators = [], {}
+        with ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix='source-fetch') as executor:
+            futures = [(source, executor.submit(fetch_source, source)) for source in sources]
+            for source, future in futures:
+                try:
+                    articles, source_validators = future.result()
+                except Exception as e:
+                    logger.error(f"Failed to fetch articles from {source}: {str(e)}")
+                    articles, source_validators = [], {}
+                logger.info(f"Fetched {len(articles)} articles from {source}")
+                SOURCE_ARTICLES.labels(source).inc(len(articles))
+                items.extend((source, article) for article in articles)
+                validators.update(source_validators)
+        return items, validators
+
+    def select_new_articles(items):
+        """Drop invalid entries and stories already stored, checking all IDs in one query"""
+        candidates = {}
+        for source, article in items:
+            if article and isinstance(article, dict) and article.get('id'):
+                candidates.setdefault(article['id'], (source, article))
+            else:
+                logger.warning(f"Skipping invalid article data: {article}")
+                ARTICLES_SKIPPED.labels('invalid').inc()
+
+        existing = find_existing_source_ids(candidates)
+        if existing:
+            logger.info(f"Skipping {len(existing)} articles that already exist")
+            ARTICLES_SKIPPED.labels('existing').inc(len(existing))
+        return [item for source_id, item in candidates.items() if source_id not in existing]
+
+    def store_fetched_articles(items, progress):
+        """Insert new stories in the fetched stage so later stages can resume them; returns False if saving failed"""
+        new_articles = select_new_articles(items)
+        progress.set('new', len(new_articles))
+        progress.set('skipped_existing', len(items) - len(new_articles))
+
+        detect_duplicates = app.config.get('DUPLICATE_DETECTION_ENABLED', True)
+        min_tokens = app.config.get('DUPLICATE_MIN_TOKENS', 20)
+
+        # Sources list their top stories first, so the position within each source is its rank
+        ranks, positions = {}, {}
+        for source, article in items:
+            if isinstance(article, dict) and article.get('id') and article['id'] not in ranks:
+                ranks[article['id']] = positions[source] = positions.get(source, -1) + 1
+
+        now = datetime.utcnow()
+        rows = [{
+            'source_id': article['id'],
+            'source': source,
+            'title': article['title'],
+            'simhash': simhash(f"{article['title']}\n{article['text']}", min_tokens=min_tokens) if detect_duplicates else None,
+            'source_rank': ranks[article['id']],
+            'stage': STAGE_FETCHED,
+            'stage_attempts': 0,
+            'created_at': now,
+            'updated_at': now
+        } for source, article in new_articles]
+        texts = {article['id']: article['text'] for _, article in new_articles}
+        try:
+            progress.set('saved', save_articles(rows, app.config.get('ARTICLE_INSERT_BATCH_SIZE', 25), texts))
+        except Exception:
+            progress.set('saved', 0)
+            return False
+
+        # Before any summary is paid for, fold stories we have effectively already rendered into the earlier one
+        if detect_duplicates and rows:
+            try:
+                progress.set('near_duplicates', merge_near_duplicates(
+                    [row['source_id'] for row in rows], app.config.get('DUPLICATE_MAX_DISTANCE', 10)
+                ))
+            except Exception as e:
+                logger.error(f"Failed to check for near-duplicate stories: {str(e)}")
+                db.session.rollback()
+        return True
+
+    def process_articles(progress):
+        """Advance every unfinished article, sequentially or through a bounded worker pool"""
+        # Stories merged into an original that failed since the last run are rendered themselves
+        try:
+            release_duplicates()
         except Exception as e:
-            logger.error(f"Failed to process article {article_data.get('id', 'unknown')}: {str(e)}")
+            logger.error(f"Failed to release duplicates of failed stories: {str(e)}")
             db.session.rollback()
 
-    def cleanup_old_articles():
-        """Remove articles older than 24 hours"""
+        article_ids = [article.id for article in sorted(
+            db.session.query(Article.id, Article.source_rank).filter(Article.stage.in_(RESUMABLE_STAGES)),
+            key=processing_priority
+        )]
+        progress.set('in_progress', len(article_ids))
+        if not article_ids:
+            logger.info("No articles to process")
+            return
+
+        limits = get_stage_limits(app.config)
+        mode = app.config.get('PIPELINE_MODE', 'concurrent')
+        if mode == 'batch':
+            summarize_in_batch(article_ids, progress)
+            # Articles the batch could not summarize wait for the next run's batch
+            summarized = {article_id for (article_id,) in db.session.query(Article.id)
+                          .filter(Article.id.in_(article_ids), Article.stage != STAGE_FETCHED)}
+            article_ids = [article_id for article_id in article_ids if article_id in summarized]
+
+        def collect(stage):
+            if stage == STAGE_FAILED:
+                progress.add('failed')
+            elif stage == STAGE_IMAGES_DONE:
+                progress.add('processed')
+            progress.flush()
+
+        if mode == 'sequential' or len(article_ids) < 2:
+            for article_id in article_ids:
+                check_lease()
+                collect(process_article(article_id, limits))
+            return
+
+        max_workers = max(1, min(app.config.get('PIPELINE_MAX_WORKERS', 8), len(article_ids)))
+        logger.info(f"Processing {len(article_ids)} articles with {max_workers} workers")
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='article-worker') as executor:
+            futures = {
+                executor.submit(process_article_in_worker, article_id, limits): article_id
+                for article_id in article_ids
+            }
+            for future in as_completed(futures):
+                try:
+                    stage = future.result()
+                except Exception as e:
+                    logger.error(f"Worker failed for article {futures[future]}: {str(e)}")
+                    stage = STAGE_FAILED
+                collect(stage)
+        check_lease()
+
+    def cleanup_old_articles(progress):
+        """Remove expired articles in bounded batches, archiving them first if configured"""
         try:
-            cutoff_time = datetime.utcnow() - timedelta(hours=24)
-            old_articles = Article.query.filter(Article.created_at < cutoff_time).all()
-            
-            for article in old_articles:
-                db.session.delete(article)
-            
-            db.session.commit()
-            logger.info(f"Cleaned up {len(old_articles)} old articles")
+            removed = sweep_expired_articles()
+            progress.set('cleaned_up', removed)
+            logger.info(f"Cleaned up {removed} old articles")
+            prune_events()
+
+            if app.config.get('IMAGE_MIRROR_ENABLED', True):
+                referenced_urls = []
+                for (image_urls,) in db.session.query(Article.image_urls):
+                    referenced_urls.extend(image_urls or [])
+                collect_garbage(referenced_urls)
         except Exception as e:
             logger.error(f"Failed to cleanup old articles: {str(e)}")
             db.session.rollback()
     
-    with app.app_context():
+    def run_pipeline(progress):
         try:
             logger.info("Starting background article fetch and process job")
             
-            # Get news source from config
-            news_source = app.config.get('NEWS_SOURCE', 'guardian')
-            logger.info(f"Using news source: {news_source}")
+            # Get news sources from config
+            news_sources = app.config.get('NEWS_SOURCES') or ['nytimes']
+            logger.info(f"Using news sources: {', '.join(news_sources)}")
             
-            # Fetch articles based on configured source
-            articles = []
-            try:
-                articles = get_nytimes_news() if news_source == 'nytimes' else get_guardian_news(page=1)
-            except Exception as e:
-                logger.error(f"Failed to fetch articles from {news_source}: {str(e)}")
+            # Fetch articles from all configured sources at once
+            progress.set_stage('fetching')
+            articles, validators = fetch_all_sources(news_sources)
+            progress.set('fetched', len(articles))
+            if articles:
+                # Until the stories are stored, the next run must fetch them again instead of getting a 304
+                if store_fetched_articles(articles, progress):
+                    source_client.save_validators(validators)
+            else:
+                logger.warning(f"No articles returned from {', '.join(news_sources)}")
             
-            if not articles:
-                logger.warning(f"No articles returned from {news_source}")
-                return
-            
-            # Process each article
-            for article in articles:
-                if article and isinstance(article, dict):
-                    process_article(article, news_source)
-                else:
-                    logger.warning(f"Skipping invalid article data: {article}")
+            # Process new articles and resume unfinished ones from earlier runs
+            check_lease()
+            progress.set_stage('processing')
+            process_articles(progress)
             
             # Cleanup old articles
-            cleanup_old_articles()
+            check_lease()
+            progress.set_stage('cleanup')
+            cleanup_old_articles(progress)
+
+            # Publish this run's finished articles and refresh the feed cache
+            check_lease()
+            progress.set_stage('publishing')
+            try:
+                progress.set('published', publish_finished_articles())
+                bump_generation()
+                # The page cache lives in process memory, so warming only pays off in a process that serves the feed
+                if app.config.get('APP_ROLE') == 'web':
+                    warm_pages()
+            except Exception as e:
+                logger.error(f"Failed to publish articles: {str(e)}")
+                db.session.rollback()
             
             logger.info("Completed background article processing job")
+            progress.finish()
             
         except Exception as e:
             logger.error(f"Background job failed: {str(e)}")
+            db.session.rollback()
+            progress.finish(error=str(e))
+
+    with app.app_context():
+        # Only one runner across all processes and hosts may refresh at a time
+        with hold_lease(app, JOB_LEASE_NAME, lease_lost) as acquired:
+            if not acquired:
+                logger.info("Article refresh is already running elsewhere, skipping this run")
+                return
+            run = claim_run(run_id)
+            run_pipeline(RunProgress(run.id))
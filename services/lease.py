@@ -0,0 +1,117 @@
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import update, delete, or_
+from sqlalchemy.exc import IntegrityError
+from models import db, JobLease
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def make_holder_id():
+    """Identify this runner uniquely across hosts, processes and runs"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+def acquire_lease(name, holder, ttl_seconds):
+    """Take the lease if it is free, expired or already ours; returns True on success"""
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=ttl_seconds)
+
+    try:
+        taken = db.session.execute(
+            update(JobLease)
+            .where(JobLease.name == name)
+            .where(or_(JobLease.expires_at < now, JobLease.holder == holder))
+            .values(holder=holder, acquired_at=now, expires_at=expires_at)
+        )
+        if taken.rowcount:
+            db.session.commit()
+            return True
+
+        if db.session.get(JobLease, name):
+            db.session.rollback()
+            return False
+
+        db.session.add(JobLease(name=name, holder=holder, acquired_at=now, expires_at=expires_at))
+        db.session.commit()
+        return True
+    except IntegrityError:
+        # Another runner created the lease row at the same moment
+        db.session.rollback()
+        return False
+
+def lease_held(name):
+    """True while some runner holds the lease and keeps renewing it"""
+    lease = db.session.get(JobLease, name)
+    return lease is not None and lease.expires_at is not None and lease.expires_at >= datetime.utcnow()
+
+def renew_lease(name, holder, ttl_seconds):
+    """Extend a lease we hold; returns False if it was lost to another runner"""
+    renewed = db.session.execute(
+        update(JobLease)
+        .where(JobLease.name == name, JobLease.holder == holder)
+        .values(expires_at=datetime.utcnow() + timedelta(seconds=ttl_seconds))
+    )
+    db.session.commit()
+    return bool(renewed.rowcount)
+
+def release_lease(name, holder):
+    db.session.execute(delete(JobLease).where(JobLease.name == name, JobLease.holder == holder))
+    db.session.commit()
+
+@contextmanager
+def hold_lease(app, name, lost=None):
+    """Hold a lease for the duration of the block, renewing it from a heartbeat thread.
+
+    Yields True if the lease was acquired and False if another runner holds it.
+    If the lease is taken over, or cannot be renewed before it expires, the
+    heartbeat sets the lost Event so the holder can stop its work.
+    """
+    ttl = app.config.get('JOB_LEASE_TTL_SECONDS', 300)
+    holder = make_holder_id()
+
+    if not acquire_lease(name, holder, ttl):
+        yield False
+        return
+
+    stop = threading.Event()
+    lost = lost or threading.Event()
+
+    def heartbeat():
+        renewed_at = time.monotonic()
+        with app.app_context():
+            while not stop.wait(ttl / 3):
+                try:
+                    if not renew_lease(name, holder, ttl):
+                        logger.error(f"Lost lease {name} held by {holder}")
+                        lost.set()
+                        return
+                    renewed_at = time.monotonic()
+                except Exception as e:
+                    logger.error(f"Failed to renew lease {name}: {str(e)}")
+                    db.session.rollback()
+                    if time.monotonic() - renewed_at >= ttl:
+                        # Another runner may take the expired lease at any moment
+                        logger.error(f"Lease {name} held by {holder} expired without renewal")
+                        lost.set()
+                        return
+
+    thread = threading.Thread(target=heartbeat, name=f"lease-{name}", daemon=True)
+    thread.start()
+    logger.info(f"Acquired lease {name} as {holder}")
+
+    try:
+        yield True
+    finally:
+        stop.set()
+        thread.join()
+        try:
+            release_lease(name, holder)
+        except Exception as e:
+            logger.error(f"Failed to release lease {name}: {str(e)}")
+            db.session.rollback()
@@ -0,0 +1,78 @@
+"""Prometheus metrics for the ingestion pipeline and the feed.
+
+When PROMETHEUS_MULTIPROC_DIR is set (app.py defaults it to <instance>/metrics)
+prometheus_client writes every value to per-process files there, so the web
+and worker processes report through the same /metrics endpoint.
+"""
+import os
+import time
+from prometheus_client import (
+    CollectorRegistry, Counter, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+)
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Normally created by create_app(); scripts may import services before the app exists
+if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+    os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+
+# Buckets sized for each kind of work: HTTP/DB calls, model calls and whole pipeline stages
+FAST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+CALL_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+STAGE_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600, 900, 1200, 1800, 3600)
+
+SOURCE_FETCH_SECONDS = Histogram(
+    'jsj_source_fetch_seconds', 'Time to fetch all new stories from one news source', ['source'],
+    buckets=CALL_BUCKETS
+)
+SOURCE_ARTICLES = Counter('jsj_source_articles_total', 'Stories returned by news sources', ['source'])
+ARTICLES_SKIPPED = Counter('jsj_articles_skipped_total', 'Fetched stories that were not stored', ['reason'])
+
+CLAUDE_REQUEST_SECONDS = Histogram(
+    'jsj_claude_request_seconds', 'Duration of Claude summary requests', ['mode', 'outcome'],
+    buckets=CALL_BUCKETS
+)
+SUMMARY_CACHE_EVENTS = Counter('jsj_summary_cache_events_total', 'Summary cache hits, misses, stores and evictions', ['event'])
+
+REPLICATE_PANEL_SECONDS = Histogram(
+    'jsj_replicate_panel_seconds', 'Time from submitting a panel prediction until it finished', ['status'],
+    buckets=CALL_BUCKETS
+)
+FALLBACK_IMAGES = Counter('jsj_fallback_images_total', 'Panels served with the default image', ['reason'])
+PROVIDER_THROTTLED = Counter(
+    'jsj_provider_throttled_total', 'Provider requests answered with 429 or a retryable 5xx', ['provider']
+)
+
+ARTICLE_STAGES = Counter('jsj_article_stage_total', 'Articles entering each pipeline stage, and failed stage attempts as "error"', ['stage'])
+PIPELINE_STAGE_SECONDS = Histogram(
+    'jsj_pipeline_stage_seconds', 'Time a refresh run spent in each stage', ['stage'],
+    buckets=STAGE_BUCKETS
+)
+PIPELINE_RUNS = Counter('jsj_pipeline_runs_total', 'Finished refresh runs', ['status'])
+
+DB_COMMIT_SECONDS = Histogram('jsj_db_commit_seconds', 'Duration of session commits, including the flush', buckets=FAST_BUCKETS)
+
+FEED_REQUEST_SECONDS = Histogram(
+    'jsj_feed_request_seconds', 'Time to build feed responses', ['endpoint'],
+    buckets=FAST_BUCKETS
+)
+FEED_PAGE_CACHE = Counter('jsj_feed_page_cache_total', 'Feed page cache lookups', ['result'])
+
+@event.listens_for(Session, 'before_commit')
+def _start_commit_timer(session):
+    session.info['commit_started'] = time.perf_counter()
+
+@event.listens_for(Session, 'after_commit')
+def _observe_commit(session):
+    started = session.info.pop('commit_started', None)
+    if started is not None:
+        DB_COMMIT_SECONDS.observe(time.perf_counter() - started)
+
+def render():
+    """Return (body, content type) of every process's metrics in Prometheus text format"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
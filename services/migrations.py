@@ -0,0 +1,193 @@
+"""In-place schema upgrades for databases created by earlier versions.
+
+db.create_all() creates missing tables but never alters existing ones, so
+every column or index added to an existing table gets a numbered migration
+here. Each step checks the live schema first, which makes it safe on fresh
+databases (where create_all already built the final schema). Applied
+versions are recorded in SchemaMigration. Deployments run migrate_db.py
+before starting any process; create_tables() and migrate() still tolerate a
+web and a worker process started at the same time against the same database.
+"""
+import logging
+import time
+from sqlalchemy import inspect, text, insert
+from sqlalchemy.exc import IntegrityError, DatabaseError
+from models import db, Article, ArticleBody, ArchivedArticle, RefreshRun, SchemaMigration, STAGE_PUBLISHED, STAGE_FAILED
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CREATE_TABLES_ATTEMPTS = 5
+
+def create_tables():
+    """db.create_all(), retried when another process creates the same tables concurrently"""
+    for attempt in range(CREATE_TABLES_ATTEMPTS):
+        try:
+            db.create_all()
+            return
+        except DatabaseError as e:
+            # create_all checks each table before creating it, so a concurrent
+            # process can create one in between; the retry skips what exists now
+            db.session.rollback()
+            if attempt == CREATE_TABLES_ATTEMPTS - 1 or not (
+                    isinstance(e, IntegrityError) or 'already exists' in str(e)):
+                raise
+            logger.info(f"Tables created concurrently by another process, retrying: {str(e.orig)}")
+            time.sleep(0.1 * (attempt + 1))
+
+def column_names(table_name):
+    return {column['name'] for column in inspect(db.engine).get_columns(table_name)}
+
+def add_columns(model, *names):
+    """ALTER TABLE ... ADD COLUMN for each named model column the table lacks"""
+    table = model.__table__
+    existing = column_names(table.name)
+    dialect = db.engine.dialect
+    for name in names:
+        if name in existing:
+            continue
+        column = table.columns[name]
+        column_type = column.type.compile(dialect=dialect)
+        db.session.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {name} {column_type}'))
+
+def add_indexes(model, *names):
+    existing = {index['name'] for index in inspect(db.engine).get_indexes(model.__table__.name)}
+    for index in model.__table__.indexes:
+        if index.name in names and index.name not in existing:
+            index.create(db.session.connection())
+
+def add_article_stages():
+    # Articles stored before the stage machine were only saved once fully processed
+    add_columns(Article, 'stage', 'stage_attempts', 'last_error', 'raw_summary', 'updated_at')
+    db.session.execute(text(
+        "UPDATE article SET stage = :stage, stage_attempts = 0, updated_at = created_at WHERE stage IS NULL"
+    ), {'stage': STAGE_PUBLISHED})
+
+def add_feed_indexes():
+    add_indexes(Article, 'ix_article_created_at_id', 'ix_article_stage_created_at_id')
+
+def add_run_timings():
+    add_columns(RefreshRun, 'timings')
+
+def add_lean_read_model():
+    columns = column_names('article')
+
+    # Rows published before the stage machine may lack panels; the feed never served those
+    db.session.execute(text(
+        "UPDATE article SET stage = :failed, last_error = 'Published without panels' "
+        "WHERE stage = :published AND NOT "
+        "(image_urls IS NOT NULL AND image_prompts IS NOT NULL "
+        "AND CAST(image_urls AS TEXT) NOT IN ('', '[]', 'null') "
+        "AND CAST(image_prompts AS TEXT) NOT IN ('', '[]', 'null'))"
+    ), {'failed': STAGE_FAILED, 'published': STAGE_PUBLISHED})
+
+    # SQLite stores JSON as text already; PostgreSQL needs the columns converted
+    if db.engine.dialect.name == 'postgresql':
+        for name in ('image_urls', 'image_prompts'):
+            db.session.execute(text(f'ALTER TABLE article ALTER COLUMN {name} TYPE JSON USING {name}::json'))
+
+    if 'original_text' in columns:
+        while True:
+            rows = db.session.execute(text(
+                "SELECT id, original_text FROM article WHERE original_text IS NOT NULL "
+                "AND id NOT IN (SELECT article_id FROM article_body) LIMIT 500"
+            )).all()
+            if not rows:
+                break
+            db.session.execute(insert(ArticleBody.__table__), [
+                {'article_id': article_id, 'content': ArticleBody.compress(original_text)}
+                for article_id, original_text in rows
+            ])
+        try:
+            with db.session.begin_nested():
+                db.session.execute(text('ALTER TABLE article DROP COLUMN original_text'))
+        except Exception as e:
+            # Older SQLite cannot drop columns; the emptied column is simply never read
+            logger.warning(f"Could not drop article.original_text, clearing it instead: {str(e)}")
+            db.session.execute(text('UPDATE article SET original_text = NULL'))
+
+def add_simhash():
+    add_columns(Article, 'simhash', 'duplicate_of')
+
+def add_source_rank():
+    add_columns(Article, 'source_rank')
+
+def add_image_variants():
+    add_columns(Article, 'image_variants')
+
+def add_search_index():
+    from services.search import create_search_index
+
+    create_search_index()
+
+def add_archive_surrogate_key():
+    # Archive rows used the hot-table id as their key, which collides once SQLite reuses article ids
+    if 'article_id' in column_names('archived_article'):
+        return
+    copied = 'source_id, source, title, created_at, archived_at, payload'
+    db.session.execute(text('ALTER TABLE archived_article RENAME TO archived_article_old'))
+    db.session.execute(text('DROP INDEX IF EXISTS ix_archived_article_source_id'))
+    ArchivedArticle.__table__.create(db.session.connection())
+    db.session.execute(text(
+        f"INSERT INTO archived_article (article_id, {copied}) "
+        f"SELECT id, {copied} FROM archived_article_old ORDER BY archived_at, id"
+    ))
+    db.session.execute(text('DROP TABLE archived_article_old'))
+
+def drop_publishable_flag():
+    # Every published article has its panels, so the flag only repeated stage = published
+    if 'publishable' not in column_names('article'):
+        return
+    db.session.execute(text(
+        "UPDATE article SET stage = :failed, last_error = 'Published without panels' "
+        "WHERE stage = :published AND NOT publishable"
+    ), {'failed': STAGE_FAILED, 'published': STAGE_PUBLISHED})
+    sqlite = db.engine.dialect.name == 'sqlite'
+    if sqlite:
+        from services.search import drop_sqlite_triggers, create_search_index
+
+        # SQLite refuses to drop a column a trigger reads
+        drop_sqlite_triggers()
+    db.session.execute(text('ALTER TABLE article DROP COLUMN publishable'))
+    if sqlite:
+        create_search_index()
+
+MIGRATIONS = [
+    (1, 'article stages', add_article_stages),
+    (2, 'feed indexes', add_feed_indexes),
+    (3, 'refresh run timings', add_run_timings),
+    (4, 'lean read model', add_lean_read_model),
+    (5, 'near-duplicate fingerprints', add_simhash),
+    (6, 'source rank', add_source_rank),
+    (7, 'image variants', add_image_variants),
+    (8, 'full-text search index', add_search_index),
+    (9, 'archive surrogate key', add_archive_surrogate_key),
+    (10, 'drop publishable flag', drop_publishable_flag),
+]
+
+def migrate():
+    """Apply every migration not yet recorded; returns the versions applied"""
+    applied = {version for (version,) in db.session.query(SchemaMigration.version)}
+    db.session.rollback()
+
+    newly_applied = []
+    for version, name, upgrade in MIGRATIONS:
+        if version in applied:
+            continue
+        try:
+            upgrade()
+            db.session.add(SchemaMigration(version=version, name=name))
+            db.session.commit()
+            newly_applied.append(version)
+            logger.info(f"Applied schema migration {version}: {name}")
+        except IntegrityError:
+            # Another process applied and recorded it first
+            db.session.rollback()
+        except Exception as e:
+            db.session.rollback()
+            if db.session.get(SchemaMigration, version):
+                # Lost a race with another process applying the same step
+                continue
+            logger.error(f"Schema migration {version} ({name}) failed: {str(e)}")
+            raise
+    return newly_applied
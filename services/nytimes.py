@@ -2,6 +2,7 @@ import requests
 import logging
 from flask import current_app
 from models import db, Article
+from services import source_client
 import json
 
 logging.basicConfig(level=logging.INFO)
@@ -17,13 +18,16 @@ def get_news(page=1):
     try:
         validate_api_key(api_key)
         
-        base_url = "https://api.nytimes.com/svc/topstories/v2/home.json"
+        base_url = current_app.config.get('NYTIMES_API_URL', "https://api.nytimes.com/svc/topstories/v2/home.json")
         params = {
             'api-key': api_key
         }
         
         logger.info(f"Fetching news articles from NYTimes API")
-        response = requests.get(base_url, params=params)
+        response = source_client.get(base_url, params=params)
+        if response is None:
+            logger.info("NYTimes top stories unchanged since last fetch")
+            return []
         
         if response.status_code == 401:
             raise ValueError("Invalid NYTimes API key")
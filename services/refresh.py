@@ -0,0 +1,167 @@
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from models import db, RefreshRun
+from services.lease import lease_held
+from services.metrics import PIPELINE_STAGE_SECONDS, PIPELINE_RUNS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+# Held by whichever runner executes the pipeline; a run is only really running while it is held
+JOB_LEASE_NAME = 'fetch_articles'
+
+def get_active_run():
+    return RefreshRun.query.filter(RefreshRun.active_slot == 1).first()
+
+def fail_abandoned_runs():
+    """Fail runs left running by a runner that died, freeing the active slot.
+
+    Only call this while holding the job lease, or once lease_held() showed
+    nobody holds it: then no live runner can be behind a running run.
+    """
+    failed = RefreshRun.query.filter(RefreshRun.active_slot == 1, RefreshRun.status == 'running').update({
+        'active_slot': None,
+        'status': 'failed',
+        'error': 'The runner stopped before the run finished',
+        'finished_at': datetime.utcnow()
+    })
+    db.session.commit()
+    if failed:
+        logger.warning(f"Marked {failed} abandoned refresh run(s) as failed")
+    return failed
+
+def enqueue_refresh(trigger='manual'):
+    """Queue a pipeline run, or coalesce onto the one already queued or running.
+
+    Returns (run, coalesced).
+    """
+    active = get_active_run()
+    if active and active.status == 'running' and not lease_held(JOB_LEASE_NAME):
+        # Its runner crashed; coalescing onto it would leave clients polling a run that never finishes
+        fail_abandoned_runs()
+        active = get_active_run()
+    if active:
+        return active, True
+
+    run = RefreshRun(active_slot=1, trigger=trigger, status='queued', counts=json.dumps({}))
+    db.session.add(run)
+    try:
+        db.session.commit()
+        logger.info(f"Queued {trigger} refresh run {run.id}")
+        return run, False
+    except IntegrityError:
+        # A concurrent request queued a run first; join that one
+        db.session.rollback()
+        return get_active_run(), True
+
+def claim_run(run_id=None, trigger='scheduled'):
+    """Mark a queued run as running, coalescing onto the active run or creating one if needed.
+
+    The caller holds the job lease, so any run still marked running was abandoned.
+    """
+    fail_abandoned_runs()
+    run = db.session.get(RefreshRun, run_id) if run_id else get_active_run()
+    if not run or run.status not in ACTIVE_STATUSES:
+        run, _ = enqueue_refresh(trigger)
+
+    run.status = 'running'
+    run.started_at = datetime.utcnow()
+    db.session.commit()
+    return run
+
+def serialize_run(run):
+    return {
+        'run_id': run.id,
+        'trigger': run.trigger,
+        'status': run.status,
+        'stage': run.stage,
+        'counts': json.loads(run.counts) if run.counts else {},
+        'timings': json.loads(run.timings) if run.timings else {},
+        'error': run.error,
+        'requested_at': run.requested_at.isoformat() + 'Z' if run.requested_at else None,
+        'started_at': run.started_at.isoformat() + 'Z' if run.started_at else None,
+        'finished_at': run.finished_at.isoformat() + 'Z' if run.finished_at else None
+    }
+
+class RunProgress:
+    """Records stage and counts of a running pipeline on its RefreshRun row.
+
+    Counts may be bumped from any thread; writes to the DB happen on the
+    calling thread, at stage changes and at most every flush_interval seconds.
+    """
+
+    def __init__(self, run_id, flush_interval=2.0):
+        self.run_id = run_id
+        self.flush_interval = flush_interval
+        self.stage = None
+        self.counts = {}
+        self.timings = {}
+        self._stage_started = time.monotonic()
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+
+    def _close_stage(self):
+        now = time.monotonic()
+        if self.stage:
+            self.timings[self.stage] = round(self.timings.get(self.stage, 0) + now - self._stage_started, 3)
+            PIPELINE_STAGE_SECONDS.labels(self.stage).observe(now - self._stage_started)
+        self._stage_started = now
+
+    def set_stage(self, stage):
+        self._close_stage()
+        self.stage = stage
+        logger.info(f"Refresh run {self.run_id}: {stage}")
+        self.flush(force=True)
+
+    def add(self, name, amount=1):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + amount
+
+    def set(self, name, value):
+        with self._lock:
+            self.counts[name] = value
+
+    def flush(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_flush < self.flush_interval:
+            return
+        self._last_flush = now
+        with self._lock:
+            counts = json.dumps(self.counts)
+        try:
+            RefreshRun.query.filter_by(id=self.run_id).update({
+                'stage': self.stage,
+                'counts': counts,
+                'timings': json.dumps(self.timings)
+            })
+            db.session.commit()
+        except Exception as e:
+            logger.error(f"Failed to record progress for refresh run {self.run_id}: {str(e)}")
+            db.session.rollback()
+
+    def finish(self, error=None):
+        """Close the run; its active slot is freed so the next refresh queues a new run"""
+        self._close_stage()
+        PIPELINE_RUNS.labels('failed' if error else 'succeeded').inc()
+        with self._lock:
+            counts = json.dumps(self.counts)
+        try:
+            RefreshRun.query.filter_by(id=self.run_id).update({
+                'active_slot': None,
+                'status': 'failed' if error else 'succeeded',
+                'stage': 'done' if not error else self.stage,
+                'counts': counts,
+                'timings': json.dumps(self.timings),
+                'error': error,
+                'finished_at': datetime.utcnow()
+            })
+            db.session.commit()
+        except Exception as e:
+            logger.error(f"Failed to finish refresh run {self.run_id}: {str(e)}")
+            db.session.rollback()
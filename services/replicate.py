@@ -1,7 +1,9 @@
-import replicate
 import logging
 import json
+import time
 from flask import current_app
+from services.metrics import REPLICATE_PANEL_SECONDS, FALLBACK_IMAGES
+from services.throttle import get_limiter
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -9,6 +11,7 @@ logger = logging.getLogger(__name__)
 DEFAULT_IMAGE_URL = "https://placehold.co/768x768?text=Comic+News"
 DEFAULT_IMAGE_URLS = [DEFAULT_IMAGE_URL] * 4
 DEFAULT_PROMPTS = ["No prompt available"] * 4
+MODEL_VERSION = "7e0502efc2a94a6b42f8572bade751196af37e9f4c4e430cd3d5c19c1ed31647"
 
 def validate_api_key(api_token):
     if not api_token or api_token == "test":
@@ -25,31 +28,213 @@ def extract_prompts(summary):
         start = summary.find(tag) + len(tag)
         end = summary.find(end_tag)
         if start > -1 and end > -1:
-            prompt = summary[start:end].strip()
-            logger.info(f"Extracted prompt {i}: {prompt}")
-            prompts.append(prompt)
+            prompts.append(summary[start:end].strip())
         else:
             logger.warning(f"Could not find prompt {i} in summary")
     return prompts
 
-def generate_images(summary, prompts=None):
-    """Generate images using Replicate API with detailed logging"""
-    api_token = current_app.config['REPLICATE_API_KEY']
+def create_client(api_token):
+    """Replicate client, or the REPLICATE_CLIENT_FACTORY stand-in when one is configured"""
+    factory = current_app.config.get('REPLICATE_CLIENT_FACTORY')
+    if factory:
+        return factory(api_token)
+
+    import replicate  # Loaded on first use so importing the pipeline stays cheap
+    return replicate.Client(api_token=api_token)
+
+def build_model_params(prompt):
+    """Build the model input for a single panel prompt"""
+    # Ensure the prompt includes the required style
+    if "in the style of garfield-strip" not in prompt.lower():
+        prompt = f"{prompt} in the style of garfield-strip"
+
+    return {
+        "prompt": prompt,
+        "model": "dev",
+        "lora_scale": 0.7,
+        "num_outputs": 1,
+        "aspect_ratio": "16:9",
+        "output_format": "webp",
+        "guidance_scale": 5,
+        "output_quality": 80,
+        "prompt_strength": 0.8,
+        "extra_lora_scale": 1,
+        "num_inference_steps": 50
+    }
+
+def submit_panel(client, prompt, panel_number):
+    """Submit a single panel as a Replicate prediction without waiting for it.
+
+    The create call goes through the Replicate limiter, which paces it and
+    retries 429/5xx responses.
+    """
+    try:
+        prediction = get_limiter('replicate', current_app.config).call(
+            client.predictions.create,
+            version=MODEL_VERSION,
+            input=build_model_params(prompt)
+        )
+        logger.debug(f"Submitted panel {panel_number}/4 as prediction {prediction.id}")
+        return prediction
+    except Exception as e:
+        logger.error(f"Failed to submit panel {panel_number}/4: {str(e)}")
+        return None
+
+def prediction_image_url(prediction):
+    """Return the first output URL of a finished prediction, if any"""
+    output = prediction.output
+    if output and isinstance(output, list) and output[0]:
+        return str(output[0])
+    if output and isinstance(output, str):
+        return output
+    return None
+
+def wait_for_panels(predictions, timeout, poll_interval, submitted_at=None):
+    """Poll submitted predictions together until each finishes or hits its timeout.
+
+    Returns one URL per prediction, with DEFAULT_IMAGE_URL for any panel that
+    failed, was never submitted or timed out. submitted_at holds the
+    time.monotonic() each prediction was created, for the panel duration metric.
+    Each poll goes through the Replicate limiter.
+    """
+    image_urls = [None] * len(predictions)
+    pending = {idx: prediction for idx, prediction in enumerate(predictions) if prediction is not None}
+    for idx, prediction in enumerate(predictions):
+        if prediction is None:
+            image_urls[idx] = DEFAULT_IMAGE_URL
+            FALLBACK_IMAGES.labels('not_submitted').inc()
+
+    started = time.monotonic()
+    submitted_at = submitted_at or [started] * len(predictions)
+    # Polls count against the Replicate rate limit like submissions, and a throttled poll backs off
+    limiter = get_limiter('replicate', current_app.config)
+
+    def finished(idx, status):
+        REPLICATE_PANEL_SECONDS.labels(status).observe(time.monotonic() - (submitted_at[idx] or started))
+        if status != "succeeded":
+            FALLBACK_IMAGES.labels(status).inc()
+            image_urls[idx] = DEFAULT_IMAGE_URL
+
+    deadline = started + timeout
+    while pending:
+        for idx, prediction in list(pending.items()):
+            try:
+                limiter.call(prediction.reload)
+            except Exception as e:
+                logger.warning(f"Failed to poll panel {idx + 1}/4: {str(e)}")
+                continue
+
+            if prediction.status == "succeeded":
+                image_url = prediction_image_url(prediction)
+                if image_url:
+                    image_urls[idx] = image_url
+                    finished(idx, "succeeded")
+                else:
+                    logger.warning(f"Panel {idx + 1}/4 returned no output, using default image")
+                    finished(idx, "no_output")
+                del pending[idx]
+            elif prediction.status in ("failed", "canceled"):
+                logger.warning(f"Panel {idx + 1}/4 {prediction.status}: {prediction.error}, using default image")
+                finished(idx, prediction.status)
+                del pending[idx]
+
+        if not pending:
+            break
+
+        if time.monotonic() >= deadline:
+            for idx, prediction in pending.items():
+                logger.warning(f"Panel {idx + 1}/4 timed out after {timeout}s, using default image")
+                finished(idx, "timeout")
+                try:
+                    prediction.cancel()
+                except Exception as e:
+                    logger.warning(f"Failed to cancel prediction {prediction.id}: {str(e)}")
+            break
+
+        time.sleep(poll_interval)
+
+    return image_urls
+
+class PanelRenderer:
+    """Submits panels one at a time as their prompts become available, then waits for all of them.
+
+    Lets a streamed Claude response start Replicate inference for a panel as
+    soon as its prompt closes, instead of after the whole response.
+    """
+
+    def __init__(self):
+        api_token = current_app.config['REPLICATE_API_KEY']
+        self.enabled = validate_api_key(api_token)
+        self.client = create_client(api_token) if self.enabled else None
+        self.prompts = [None] * 4
+        self.predictions = [None] * 4
+        self.submitted_at = [None] * 4
+
+    def submit(self, index, prompt):
+        """Start inference for one panel; later prompts for the same panel are ignored"""
+        if not 0 <= index < 4 or self.prompts[index] is not None:
+            return
+        self.prompts[index] = prompt
+        if self.enabled:
+            self.submitted_at[index] = time.monotonic()
+            self.predictions[index] = submit_panel(self.client, prompt, index + 1)
+
+    def on_tag(self, tag, content):
+        """Callback for streamed responses: dispatch each image_promptN as soon as it closes"""
+        if tag.startswith('image_prompt'):
+            self.submit(int(tag[len('image_prompt'):]) - 1, content)
+
+    def cancel(self):
+        """Cancel predictions already in flight, e.g. when the summary failed half way"""
+        for prediction in self.predictions:
+            if prediction is not None:
+                try:
+                    prediction.cancel()
+                except Exception as e:
+                    logger.warning(f"Failed to cancel prediction {prediction.id}: {str(e)}")
+
+    def finish(self, prompts=None):
+        """Submit any panels not started yet and wait for all four.
+
+        Returns (image_urls, prompts) as JSON strings, like generate_images.
+        """
+        if not self.enabled:
+            FALLBACK_IMAGES.labels('no_api_key').inc(len(DEFAULT_IMAGE_URLS))
+            return json.dumps(DEFAULT_IMAGE_URLS), json.dumps(DEFAULT_PROMPTS)
 
-    if not validate_api_key(api_token):
-        logger.info("Using default images due to missing API key")
-        return json.dumps(DEFAULT_IMAGE_URLS), json.dumps(DEFAULT_PROMPTS)
+        for idx, prompt in enumerate((prompts or [])[:4]):
+            self.submit(idx, prompt)
+
+        image_urls = wait_for_panels(
+            self.predictions,
+            timeout=current_app.config.get('REPLICATE_PANEL_TIMEOUT', 300),
+            poll_interval=current_app.config.get('REPLICATE_POLL_INTERVAL', 1.0),
+            submitted_at=self.submitted_at
+        )
+
+        if all(url == DEFAULT_IMAGE_URL for url in image_urls):
+            logger.warning("All panels failed to generate, returning default images")
+            return json.dumps(DEFAULT_IMAGE_URLS), json.dumps(DEFAULT_PROMPTS)
 
+        failed = sum(1 for url in image_urls if url == DEFAULT_IMAGE_URL)
+        if failed:
+            logger.warning(f"{failed} of {len(image_urls)} panels failed, using default image for those panels")
+
+        prompts = [prompt or DEFAULT_PROMPTS[idx] for idx, prompt in enumerate(self.prompts)]
+        return json.dumps(image_urls), json.dumps(prompts)
+
+def generate_images(summary, prompts=None):
+    """Generate the four panels as concurrent Replicate predictions"""
     try:
-        logger.info("Starting image generation process using Replicate API")
-        client = replicate.Client(api_token=api_token)
+        renderer = PanelRenderer()
+        if not renderer.enabled:
+            return renderer.finish()
 
         # Extract prompts from summary if not provided
         if not prompts:
             extracted_prompts = extract_prompts(summary)
             if len(extracted_prompts) == 4:
                 prompts = extracted_prompts
-                logger.info("Successfully extracted all 4 prompts from summary")
             else:
                 logger.warning(f"Found only {len(extracted_prompts)} prompts, using default prompts")
                 prompts = [
@@ -59,50 +244,8 @@ def generate_images(summary, prompts=None):
                     f"{summary} in the style of garfield-strip with cinematic framing"
                 ]
 
-        model_params = {
-            "prompt": None,  # Will be set in loop
-            "model": "dev",
-            "lora_scale": 0.7,
-            "num_outputs": 1,
-            "aspect_ratio": "16:9",
-            "output_format": "webp",
-            "guidance_scale": 5,
-            "output_quality": 80,
-            "prompt_strength": 0.8,
-            "extra_lora_scale": 1,
-            "num_inference_steps": 50
-        }
-        logger.info(f"Using model parameters: {json.dumps(model_params, indent=2)}")
-
-        image_urls = []
-        for idx, prompt in enumerate(prompts[:4]):
-            logger.info(f"Generating image {idx + 1}/4")
-            logger.info(f"Using prompt: {prompt}")
-
-            # Ensure the prompt includes the required style
-            if "in the style of garfield-strip" not in prompt.lower():
-                prompt = f"{prompt} in the style of garfield-strip"
-
-            model_params["prompt"] = prompt
-            output = client.run(
-                "pellmellism/xkcd:7e0502efc2a94a6b42f8572bade751196af37e9f4c4e430cd3d5c19c1ed31647",
-                input=model_params
-            )
-
-            if output and isinstance(output, list) and output[0]:
-                image_url = str(output[0])
-                logger.info(f"Successfully generated image {idx + 1}, URL: {image_url}")
-                image_urls.append(image_url)
-            else:
-                logger.warning(f"Failed to generate image {idx + 1}, using default image")
-                image_urls.append(DEFAULT_IMAGE_URL)
-
-        if not all(image_urls):
-            logger.warning("Some images failed to generate, returning default images")
-            return json.dumps(DEFAULT_IMAGE_URLS), json.dumps(DEFAULT_PROMPTS)
-
-        logger.info(f"Successfully generated all {len(image_urls)} images")
-        return json.dumps(image_urls), json.dumps(prompts[:4])
+        # Submit all panels up front so inference runs in parallel on Replicate
+        return renderer.finish(prompts[:4])
 
     except Exception as e:
         logger.error(f"Unexpected error in generate_images: {str(e)}")
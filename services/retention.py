@@ -0,0 +1,123 @@
+import gzip
+import json
+import logging
+import os
+import zlib
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, delete, insert
+from models import db, Article, ArticleBody, ArchivedArticle
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ARCHIVE_MODES = ('none', 'table', 'file')
+
+def _row_to_json(row):
+    return json.dumps({
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in row.items()
+    })
+
+def archive_to_table(rows):
+    """Copy expired rows into ArchivedArticle within the caller's transaction"""
+    now = datetime.utcnow()
+    db.session.execute(insert(ArchivedArticle.__table__), [
+        {
+            'article_id': row['id'],
+            'source_id': row['source_id'],
+            'source': row['source'],
+            'title': row['title'],
+            'created_at': row['created_at'],
+            'archived_at': now,
+            'payload': zlib.compress(_row_to_json(row).encode('utf-8'))
+        }
+        for row in rows
+    ])
+
+def archive_to_file(rows):
+    """Append swept rows to today's gzip-compressed JSON Lines file"""
+    archive_dir = current_app.config.get('ARTICLE_ARCHIVE_DIR') or os.path.join(current_app.instance_path, 'archive')
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"articles-{datetime.utcnow():%Y-%m-%d}.jsonl.gz")
+
+    # Each append adds a gzip member; readers see one continuous stream
+    with gzip.open(path, 'at', encoding='utf-8') as archive:
+        for row in rows:
+            archive.write(_row_to_json(row) + '\n')
+
+def sweep_expired_articles():
+    """Delete articles past RETENTION_HOURS with set-based DELETEs in bounded batches.
+
+    Each batch is its own transaction, and a run stops after
+    RETENTION_MAX_BATCHES so a large backlog is worked off over several job
+    runs instead of stalling one. Returns the number of rows removed.
+    """
+    config = current_app.config
+    cutoff_time = datetime.utcnow() - timedelta(hours=config.get('RETENTION_HOURS', 24))
+    batch_size = config.get('RETENTION_BATCH_SIZE', 500)
+    max_batches = config.get('RETENTION_MAX_BATCHES', 20)
+    archive_mode = config.get('ARTICLE_ARCHIVE_MODE', 'none')
+    if archive_mode not in ARCHIVE_MODES:
+        logger.warning(f"Unknown ARTICLE_ARCHIVE_MODE {archive_mode}, discarding expired articles")
+        archive_mode = 'none'
+
+    table = Article.__table__
+    removed = 0
+
+    for _ in range(max_batches):
+        if archive_mode == 'none':
+            ids = db.session.execute(
+                select(table.c.id)
+                .where(table.c.created_at < cutoff_time)
+                .order_by(table.c.created_at)
+                .limit(batch_size)
+            ).scalars().all()
+            rows = []
+        else:
+            rows = [dict(row) for row in db.session.execute(
+                select(table)
+                .where(table.c.created_at < cutoff_time)
+                .order_by(table.c.created_at)
+                .limit(batch_size)
+            ).mappings()]
+            ids = [row['id'] for row in rows]
+
+        if not ids:
+            break
+
+        if rows:
+            # Archives keep the story text, which lives compressed in ArticleBody
+            bodies = dict(db.session.execute(
+                select(ArticleBody.article_id, ArticleBody.content).where(ArticleBody.article_id.in_(ids))
+            ).all())
+            for row in rows:
+                content = bodies.get(row['id'])
+                row['original_text'] = zlib.decompress(content).decode('utf-8') if content else None
+
+        try:
+            if archive_mode == 'table':
+                archive_to_table(rows)
+
+            db.session.execute(delete(ArticleBody).where(ArticleBody.article_id.in_(ids)))
+            db.session.execute(delete(table).where(table.c.id.in_(ids)))
+            db.session.commit()
+            removed += len(ids)
+        except Exception as e:
+            logger.error(f"Failed to sweep batch of {len(ids)} expired articles: {str(e)}")
+            db.session.rollback()
+            break
+
+        if archive_mode == 'file':
+            # Only appended once the DELETE committed, so a batch that rolls back and is retried is never archived twice
+            try:
+                archive_to_file(rows)
+            except Exception as e:
+                logger.error(f"Failed to archive {len(rows)} swept articles (ids {ids[0]}..{ids[-1]}) to file: {str(e)}")
+
+        if len(ids) < batch_size:
+            break
+    else:
+        logger.info("Retention sweep hit RETENTION_MAX_BATCHES, remaining rows are left for the next run")
+
+    return removed
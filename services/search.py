@@ -0,0 +1,152 @@
+"""Full-text search over published comics.
+
+SQLite uses an FTS5 table, article_search, that indexes the title, comic
+header, summary and panel prompts of published articles without copying
+them (external content). Triggers on article keep it in step as articles
+are published, edited and deleted by retention, and results are ranked
+with bm25. PostgreSQL
+uses a generated, weighted tsvector column with a GIN index, ranked with
+ts_rank_cd.
+
+Pages are cursor based on (score, id), with lower scores ranking first.
+Scores move when the index changes, so a cursor gives a stable page walk only
+until the next ingestion run; after that it is still valid, just approximate.
+"""
+import logging
+import re
+from sqlalchemy import text, inspect, Float
+from models import db, Article, STAGE_PUBLISHED
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SEARCH_TABLE = 'article_search'
+# bm25 weight of each indexed column: a match in the title counts most, one in a panel prompt least
+SEARCH_COLUMNS = (('title', 10.0), ('comic_header', 5.0), ('comic_summary', 2.0), ('image_prompts', 1.0))
+TERM_PATTERN = re.compile(r'\w+')
+MAX_TERMS = 8
+
+# Columns a result needs for serialize_article, typed so JSON columns are decoded
+RESULT_COLUMNS = (
+    Article.id, Article.title, Article.comic_header, Article.comic_summary,
+    Article.image_urls, Article.image_prompts, Article.image_variants
+)
+
+def create_sqlite_index():
+    names = ', '.join(name for name, _ in SEARCH_COLUMNS)
+    # Only published rows are indexed, so ranking never has to skip in-flight articles
+    indexed = "{row}.stage = '" + STAGE_PUBLISHED + "'"
+    remove_old = (
+        f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, {names}) "
+        f"SELECT 'delete', old.id, {', '.join(f'old.{name}' for name, _ in SEARCH_COLUMNS)} "
+        f"WHERE {indexed.format(row='old')};"
+    )
+    add_new = (
+        f"INSERT INTO {SEARCH_TABLE}(rowid, {names}) "
+        f"SELECT new.id, {', '.join(f'new.{name}' for name, _ in SEARCH_COLUMNS)} "
+        f"WHERE {indexed.format(row='new')};"
+    )
+
+    statements = [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5({names}, content='article', "
+        f"content_rowid='id', tokenize='porter unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_insert AFTER INSERT ON article BEGIN {add_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_delete AFTER DELETE ON article BEGIN {remove_old} END",
+        # Timestamp and attempt updates leave the index alone; publishing or editing an indexed column reindexes the row
+        f"CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_update AFTER UPDATE OF {names}, stage ON article "
+        f"BEGIN {remove_old} {add_new} END",
+        # Index rows that existed before the triggers, and repair an index left behind by a reset
+        f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('delete-all')",
+        f"INSERT INTO {SEARCH_TABLE}(rowid, {names}) SELECT id, {names} FROM article "
+        f"WHERE {indexed.format(row='article')}"
+    ]
+    for statement in statements:
+        db.session.execute(text(statement))
+
+def drop_sqlite_triggers():
+    """Drop the triggers that keep the index in step, e.g. before altering columns they read"""
+    for event in ('insert', 'delete', 'update'):
+        db.session.execute(text(f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_{event}"))
+
+def create_postgresql_index():
+    if 'search_vector' in {column['name'] for column in inspect(db.engine).get_columns('article')}:
+        return
+    weights = dict(zip((name for name, _ in SEARCH_COLUMNS), 'ABCD'))
+    vector = ' || '.join(
+        f"setweight(to_tsvector('english', coalesce({name}{'::text' if name == 'image_prompts' else ''}, '')), '{weight}')"
+        for name, weight in weights.items()
+    )
+    db.session.execute(text(f"ALTER TABLE article ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({vector}) STORED"))
+    db.session.execute(text("CREATE INDEX IF NOT EXISTS ix_article_search_vector ON article USING GIN (search_vector)"))
+
+def create_search_index():
+    """Create the search index for the current database; called from a schema migration"""
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        create_sqlite_index()
+    elif dialect == 'postgresql':
+        create_postgresql_index()
+    else:
+        logger.warning(f"Full-text search is not supported on {dialect}")
+
+def search_terms(query):
+    """Split a user query into at most MAX_TERMS lowercase word terms.
+
+    Only word characters survive, so user input can never inject FTS5 or
+    tsquery operators.
+    """
+    return TERM_PATTERN.findall((query or '').lower())[:MAX_TERMS]
+
+def encode_cursor(score, article_id):
+    return f"{score!r}_{article_id}"
+
+def decode_cursor(cursor):
+    """Parse a search cursor into (score, id); raises ValueError for malformed cursors"""
+    score, _, article_id = cursor.rpartition('_')
+    return float(score), int(article_id)
+
+def _page_sql(dialect, after_cursor):
+    """SELECT of one page of published matches with their scores, best first"""
+    columns = ', '.join(f'article.{column.name}' for column in RESULT_COLUMNS)
+    after = "WHERE score > :after_score OR (score = :after_score AND id > :after_id)" if after_cursor else ""
+    if dialect == 'sqlite':
+        # Rank inside the FTS table and join only the page's rows back to article
+        weights = ', '.join(str(weight) for _, weight in SEARCH_COLUMNS)
+        return (
+            f"SELECT {columns}, page.score FROM ("
+            f"SELECT * FROM (SELECT rowid AS id, bm25({SEARCH_TABLE}, {weights}) AS score "
+            f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match) AS matches "
+            f"{after} ORDER BY score, id LIMIT :limit"
+            f") AS page JOIN article ON article.id = page.id ORDER BY page.score, page.id"
+        )
+    return (
+        f"SELECT * FROM (SELECT {columns}, -ts_rank_cd(article.search_vector, to_tsquery('english', :match)) AS score "
+        f"FROM article WHERE article.search_vector @@ to_tsquery('english', :match) "
+        f"AND article.stage = :stage) AS matches "
+        f"{after} ORDER BY score, id LIMIT :limit"
+    )
+
+def match_expression(terms, dialect):
+    """Every term must match; the last one also matches as a prefix, for search-as-you-type"""
+    if dialect == 'sqlite':
+        return ' '.join(f'"{term}"' for term in terms[:-1]) + f' "{terms[-1]}"*'
+    return ' & '.join(terms[:-1] + [f'{terms[-1]}:*'])
+
+def search_articles(query, cursor=None, limit=24):
+    """Return (rows, next_cursor) of published articles matching query, best first.
+
+    Raises ValueError for an empty query or a malformed cursor.
+    """
+    terms = search_terms(query)
+    if not terms:
+        raise ValueError("Empty search query")
+
+    dialect = db.engine.dialect.name
+    params = {'match': match_expression(terms, dialect).strip(), 'stage': STAGE_PUBLISHED, 'limit': limit}
+    if cursor:
+        params['after_score'], params['after_id'] = decode_cursor(cursor)
+
+    sql = text(_page_sql(dialect, bool(cursor))).columns(*RESULT_COLUMNS, score=Float)
+    rows = db.session.execute(sql, params).all()
+    next_cursor = encode_cursor(rows[-1].score, rows[-1].id) if len(rows) == limit else None
+    return rows, next_cursor
@@ -0,0 +1,50 @@
+import hashlib
+import re
+
+# 64-bit SimHash over word shingles: near-identical stories get fingerprints a few bits apart
+FINGERPRINT_BITS = 64
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall((text or '').lower())
+
+def _shingle_hash(shingle):
+    # blake2b rather than hash(), which is salted per process
+    return int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+
+def simhash(text, shingle_size=3, min_tokens=20):
+    """Return the SimHash of text as a signed 64-bit int (fits a BIGINT column), or None if too short to compare"""
+    tokens = tokenize(text)
+    if len(tokens) < min_tokens:
+        return None
+
+    weights = [0] * FINGERPRINT_BITS
+    shingles = {' '.join(tokens[i:i + shingle_size]) for i in range(len(tokens) - shingle_size + 1)}
+    for shingle in shingles:
+        value = _shingle_hash(shingle)
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+
+    fingerprint = sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+    return fingerprint - (1 << FINGERPRINT_BITS) if fingerprint >= 1 << (FINGERPRINT_BITS - 1) else fingerprint
+
+def distance(a, b):
+    """Number of differing bits between two fingerprints"""
+    return ((a ^ b) & ((1 << FINGERPRINT_BITS) - 1)).bit_count()
+
+def find_near_duplicate(fingerprint, candidates, max_distance=3):
+    """Return the id of the closest candidate within max_distance bits, or None.
+
+    candidates is an iterable of (id, fingerprint) pairs.
+    """
+    if fingerprint is None:
+        return None
+
+    best_id, best_distance = None, max_distance + 1
+    for candidate_id, candidate in candidates:
+        if candidate is None:
+            continue
+        bits = distance(fingerprint, candidate)
+        if bits < best_distance:
+            best_id, best_distance = candidate_id, bits
+    return best_id
@@ -0,0 +1,116 @@
+import logging
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from flask import current_app
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_session = None
+_session_lock = threading.Lock()
+
+# Last ETag/Last-Modified seen per request, keyed by URL and parameters
+_validators = {}
+_validators_lock = threading.Lock()
+# Validators of 200 responses not yet saved, per fetching thread; see take_validators
+_staged = threading.local()
+
+def get_session():
+    """Return the process-wide session so news sources reuse pooled TCP/TLS connections"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                pool_size = current_app.config.get('SOURCE_POOL_SIZE', 10)
+                adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+def _validator_key(url, params):
+    return (url, tuple(sorted((params or {}).items())))
+
+def _retry_delay(response, attempt):
+    """Honour Retry-After when the server sends it, otherwise exponential backoff with full jitter"""
+    if response is not None:
+        retry_after = response.headers.get('Retry-After')
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), current_app.config.get('SOURCE_MAX_BACKOFF', 30))
+
+    base = current_app.config.get('SOURCE_BACKOFF_BASE', 1.0)
+    cap = current_app.config.get('SOURCE_MAX_BACKOFF', 30)
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+def take_validators():
+    """Return and clear the validators of the 200 responses this thread received since the last call"""
+    staged = getattr(_staged, 'validators', {})
+    _staged.validators = {}
+    return staged
+
+def save_validators(validators):
+    """Revalidate later requests with these validators; call only once the stories they cover are stored"""
+    if validators:
+        with _validators_lock:
+            _validators.update(validators)
+
+def get(url, params=None, conditional=True):
+    """GET a news source with timeouts, retries on 429/5xx and conditional revalidation.
+
+    Returns the response, or None when the server answered 304 Not Modified.
+    Other error statuses are returned for the caller to handle. Validators of
+    a 200 response are only staged: a 304 must not hide stories that were
+    fetched but never saved, so the caller passes them to save_validators
+    after storing the stories.
+    """
+    session = get_session()
+    timeout = (
+        current_app.config.get('SOURCE_CONNECT_TIMEOUT', 5),
+        current_app.config.get('SOURCE_READ_TIMEOUT', 30)
+    )
+    max_retries = current_app.config.get('SOURCE_MAX_RETRIES', 3)
+    key = _validator_key(url, params)
+
+    headers = {}
+    if conditional:
+        with _validators_lock:
+            etag, last_modified = _validators.get(key, (None, None))
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+
+    attempt = 0
+    while True:
+        response = None
+        try:
+            response = session.get(url, params=params, headers=headers, timeout=timeout)
+            if response.status_code not in RETRY_STATUSES or attempt >= max_retries:
+                break
+            logger.warning(f"{url} returned {response.status_code}, retrying ({attempt + 1}/{max_retries})")
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if attempt >= max_retries:
+                raise
+            logger.warning(f"Request to {url} failed: {str(e)}, retrying ({attempt + 1}/{max_retries})")
+
+        time.sleep(_retry_delay(response, attempt))
+        attempt += 1
+
+    if response.status_code == 304:
+        return None
+
+    if conditional and response.status_code == 200:
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if etag or last_modified:
+            if not hasattr(_staged, 'validators'):
+                _staged.validators = {}
+            _staged.validators[key] = (etag, last_modified)
+
+    return response
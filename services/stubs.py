@@ -0,0 +1,399 @@
+"""Deterministic offline stand-ins for the NYTimes, Guardian, Anthropic and Replicate APIs.
+
+Used by the benchmarks in benchmarks/ to run the whole pipeline without
+network access or API keys. Every stand-in takes a StubProfile controlling
+latency, jitter and error rate, and is seeded so runs are repeatable.
+"""
+import hashlib
+import io
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from PIL import Image, ImageDraw
+
+# Large enough that unrelated stories share almost no word shingles, as real ones don't
+WORDS = [
+    word + suffix
+    for word in (
+        "council budget storm harbor election court vaccine market bridge senator "
+        "drought festival satellite union tariff museum wildfire summit railway ballot "
+        "minister protest hospital school river airport factory border treaty reactor "
+        "village mayor strike pension flood virus bank oil grain vote police army "
+        "judge report study climate energy housing transit rocket league coach player"
+    ).split()
+    for suffix in ('', 's', 'ed', 'ing', 'er', 'al')
+]
+
+IMAGE_DRAWINGS = 8
+
+def draw_panel(seed, width):
+    """A 16:9 WebP of random outlined shapes, compressing about like a comic panel"""
+    rng = random.Random(seed)
+    height = round(width * 9 / 16)
+    image = Image.new('RGB', (width, height), (250, 248, 240))
+    draw = ImageDraw.Draw(image)
+    scale = width / 1344
+    for _ in range(40):
+        x, y, r = rng.randrange(width), rng.randrange(height), int(rng.randrange(10, 120) * scale) + 1
+        fill = tuple(rng.randrange(256) for _ in range(3)) if rng.random() < 0.3 else None
+        draw.ellipse((x - r, y - r, x + r, y + r), outline=(30, 30, 30), fill=fill, width=3)
+    for _ in range(30):
+        draw.line([(rng.randrange(width), rng.randrange(height)) for _ in range(2)], fill=(20, 20, 20), width=3)
+    buffer = io.BytesIO()
+    image.save(buffer, 'WEBP', quality=80)
+    return buffer.getvalue()
+
+class StubProfile:
+    """Latency, jitter (seconds) and error rate of one stubbed provider"""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, seed=0, throttle_rate=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self):
+        with self._lock:
+            return self.latency + self._random.uniform(0, self.jitter)
+
+    def should_fail(self):
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def should_throttle(self):
+        with self._lock:
+            return self._random.random() < self.throttle_rate
+
+    def wait(self):
+        time.sleep(self.delay())
+
+class StubRateLimitError(Exception):
+    """Raised like the SDKs' 429 errors: carries status_code and a Retry-After-less response"""
+    status_code = 429
+
+    def __init__(self, provider):
+        super().__init__(f"Stub {provider} rate limit exceeded")
+
+def _words(seed, count):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+def fake_summary(text, prompt_words=40):
+    """A response in the exact tagged format get_comic_summary expects, derived from the text"""
+    seed = int(hashlib.sha256(text.encode('utf-8')).hexdigest()[:8], 16)
+    style = "A black and white stick figure comic panel in XKCD style.The linework should be simple and clean, typical of XKCD comics."
+    panels = "\n\n".join(
+        f"<image_prompt{i}>\n{style} {_words(seed + i, prompt_words)}\n</image_prompt{i}>"
+        for i in range(1, 5)
+    )
+    return (
+        f"<comic_header>\n{_words(seed, 6).title()}\n</comic_header>\n\n"
+        f"<summary>\n{_words(seed + 100, 45)}.\n</summary>\n\n{panels}"
+    )
+
+# Anthropic
+
+class _StubContent:
+    def __init__(self, text):
+        self.text = text
+
+class _StubMessage:
+    def __init__(self, text):
+        self.content = [_StubContent(text)]
+
+class _StubStream:
+    def __init__(self, text, profile, chunk_size):
+        self.text = text
+        self.profile = profile
+        self.chunk_size = chunk_size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    @property
+    def text_stream(self):
+        # Spread the call latency over the chunks, like tokens arriving from the API
+        chunks = [self.text[i:i + self.chunk_size] for i in range(0, len(self.text), self.chunk_size)]
+        per_chunk = self.profile.delay() / max(len(chunks), 1)
+        for chunk in chunks:
+            time.sleep(per_chunk)
+            yield chunk
+
+class _StubMessages:
+    def __init__(self, profile, prompt_words, chunk_size):
+        self.profile = profile
+        self.prompt_words = prompt_words
+        self.chunk_size = chunk_size
+
+    def _respond(self, request):
+        if self.profile.should_throttle():
+            raise StubRateLimitError('Claude')
+        if self.profile.should_fail():
+            raise RuntimeError("Stub Claude failure")
+        return fake_summary(request['messages'][0]['content'], self.prompt_words)
+
+    def create(self, **request):
+        self.profile.wait()
+        return _StubMessage(self._respond(request))
+
+    def stream(self, **request):
+        return _StubStream(self._respond(request), self.profile, self.chunk_size)
+
+class StubAnthropicClient:
+    """Stands in for anthropic.Client: messages.create and messages.stream"""
+
+    def __init__(self, profile=None, prompt_words=40, chunk_size=24):
+        self.messages = _StubMessages(profile or StubProfile(), prompt_words, chunk_size)
+
+    def factory(self, api_key):
+        """Use as CLAUDE_CLIENT_FACTORY"""
+        return self
+
+class StubBatchTransport:
+    """Stands in for the Message Batches API; use as CLAUDE_BATCH_TRANSPORT"""
+
+    def __init__(self, profile=None, prompt_words=40):
+        self.profile = profile or StubProfile()
+        self.prompt_words = prompt_words
+        self.batches = {}
+
+    def create(self, requests):
+        batch_id = f"stub-batch-{len(self.batches) + 1}"
+        self.batches[batch_id] = (time.monotonic() + self.profile.delay(), requests)
+        return batch_id
+
+    def is_done(self, batch_id):
+        return time.monotonic() >= self.batches[batch_id][0]
+
+    def results(self, batch_id):
+        for request in self.batches[batch_id][1]:
+            if self.profile.should_fail():
+                yield request['custom_id'], None, 'errored'
+            else:
+                text = request['params']['messages'][0]['content']
+                yield request['custom_id'], fake_summary(text, self.prompt_words), None
+
+    def cancel(self, batch_id):
+        self.batches.pop(batch_id, None)
+
+# Replicate
+
+class StubPrediction:
+    _counter = 0
+    _counter_lock = threading.Lock()
+
+    def __init__(self, profile, image_base_url):
+        with StubPrediction._counter_lock:
+            StubPrediction._counter += 1
+            number = StubPrediction._counter
+        self.id = f"stub-{number}"
+        self.status = "starting"
+        self.output = None
+        self.error = None
+        self._ready_at = time.monotonic() + profile.delay()
+        self._fails = profile.should_fail()
+        self._url = f"{image_base_url}/{number}.webp"
+
+    def reload(self):
+        if self.status in ("starting", "processing") and time.monotonic() >= self._ready_at:
+            if self._fails:
+                self.status = "failed"
+                self.error = "Stub Replicate failure"
+            else:
+                self.status = "succeeded"
+                self.output = [self._url]
+        elif self.status == "starting":
+            self.status = "processing"
+
+    def cancel(self):
+        if self.status in ("starting", "processing"):
+            self.status = "canceled"
+
+class _StubPredictions:
+    def __init__(self, profile, image_base_url):
+        self.profile = profile
+        self.image_base_url = image_base_url
+
+    def create(self, version=None, input=None, **kwargs):
+        if self.profile.should_throttle():
+            raise StubRateLimitError('Replicate')
+        return StubPrediction(self.profile, self.image_base_url)
+
+class StubReplicateClient:
+    """Stands in for replicate.Client: predictions.create, reload and cancel"""
+
+    def __init__(self, profile=None, image_base_url="http://127.0.0.1/img"):
+        self.predictions = _StubPredictions(profile or StubProfile(), image_base_url)
+
+    def factory(self, api_token):
+        """Use as REPLICATE_CLIENT_FACTORY"""
+        return self
+
+# News sources and image downloads
+
+class StubNewsServer:
+    """Local HTTP server answering like the NYTimes top stories and Guardian search APIs.
+
+    Also serves /img/<n>.webp, real 16:9 WebP drawings image_width pixels wide,
+    so mirrored panel downloads and variant builds stay local. Call
+    publish() to add stories; until then the feeds are unchanged and answer
+    conditional requests with 304. duplicate_rate is the share of Guardian
+    stories that re-report an NYTimes story with a few words changed.
+    """
+
+    def __init__(self, profile=None, articles=25, text_words=300, image_width=1344, seed=0, duplicate_rate=0.0):
+        self.profile = profile or StubProfile()
+        self.articles = articles
+        self.duplicate_rate = duplicate_rate
+        self.text_words = text_words
+        self.image_width = image_width
+        self._images = {}
+        self._images_lock = threading.Lock()
+        self.seed = seed
+        self.version = 0
+        self.requests = 0
+        self._server = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    @property
+    def nytimes_url(self):
+        return f"{self.base_url}/nyt/home.json"
+
+    @property
+    def guardian_url(self):
+        return f"{self.base_url}/guardian/search"
+
+    @property
+    def image_base_url(self):
+        return f"{self.base_url}/img"
+
+    def publish(self, count=None):
+        """Make the next fetch return a fresh set of stories"""
+        self.version += 1
+        if count is not None:
+            self.articles = count
+
+    def _story(self, source, number):
+        key = self.seed * 1000003 + self.version * 10007 + number * 2 + (source == 'guardian')
+        if source == 'guardian' and number < self.articles * self.duplicate_rate:
+            story = self._story('nyt', number)
+            words = story['text'].split()
+            rng = random.Random(key)
+            for _ in range(max(1, len(words) // 50)):
+                words[rng.randrange(len(words))] = rng.choice(WORDS)
+            return {'id': f"{source}://stub/{self.version}/{number}", 'title': story['title'], 'text': ' '.join(words)}
+
+        return {
+            'id': f"{source}://stub/{self.version}/{number}",
+            'title': _words(key, 8).title(),
+            'text': _words(key + 1, self.text_words)
+        }
+
+    def nytimes_payload(self):
+        return {'results': [
+            {'uri': story['id'], 'title': story['title'], 'abstract': story['text']}
+            for story in (self._story('nyt', n) for n in range(self.articles))
+        ]}
+
+    def guardian_payload(self, page, page_size):
+        start = (page - 1) * page_size
+        numbers = range(start, min(start + page_size, self.articles))
+        return {'response': {'results': [
+            {'id': story['id'], 'webTitle': story['title'], 'fields': {'bodyText': story['text']}}
+            for story in (self._story('guardian', n) for n in numbers)
+        ]}}
+
+    def image(self, path):
+        """WebP bytes for an image path.
+
+        A handful of drawings are encoded once and reused; the path is appended
+        past the end of the RIFF data, which decoders ignore, so every panel
+        still has its own digest.
+        """
+        number = int(random.Random(path).random() * IMAGE_DRAWINGS)
+        with self._images_lock:
+            if number not in self._images:
+                self._images[number] = draw_panel(number, self.image_width)
+            data = self._images[number]
+        return data + path.encode('utf-8')
+
+    def start(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body=b'', content_type='application/json', headers=None):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                stub.requests += 1
+                stub.profile.wait()
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+
+                if url.path.startswith('/img/'):
+                    self._send(200, stub.image(url.path), 'image/webp')
+                    return
+
+                if stub.profile.should_fail():
+                    self._send(503, headers={'Retry-After': '0'})
+                    return
+
+                page = int(query.get('page', ['1'])[0])
+                etag = f'"{stub.version}-{url.path}-{page}"'
+                if self.headers.get('If-None-Match') == etag:
+                    self._send(304, headers={'ETag': etag})
+                    return
+
+                if url.path == '/nyt/home.json':
+                    payload = stub.nytimes_payload()
+                elif url.path == '/guardian/search':
+                    payload = stub.guardian_payload(page, int(query.get('page-size', ['10'])[0]))
+                else:
+                    self._send(404)
+                    return
+                self._send(200, json.dumps(payload).encode('utf-8'), headers={'ETag': etag})
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='stub-news-server', daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+def install(app, news_server, claude=None, replicate=None, batch=None):
+    """Point an app at the stand-ins; API keys are set to dummy values so the key checks pass"""
+    app.config.update(
+        NYTIMES_API_KEY='stub',
+        GUARDIAN_API_KEY='stub',
+        CLAUDE_API_KEY='stub',
+        REPLICATE_API_KEY='stub',
+        NYTIMES_API_URL=news_server.nytimes_url,
+        GUARDIAN_API_URL=news_server.guardian_url,
+        CLAUDE_CLIENT_FACTORY=(claude or StubAnthropicClient()).factory,
+        REPLICATE_CLIENT_FACTORY=(replicate or StubReplicateClient(image_base_url=news_server.image_base_url)).factory,
+        CLAUDE_BATCH_TRANSPORT=batch or StubBatchTransport()
+    )
@@ -0,0 +1,103 @@
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from models import db, SummaryCache
+from services.metrics import SUMMARY_CACHE_EVENTS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_stats_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+
+def _count(name, amount=1):
+    with _stats_lock:
+        _stats[name] += amount
+    SUMMARY_CACHE_EVENTS.labels(name).inc(amount)
+
+def get_stats():
+    """Return the hit/miss counters for this process"""
+    with _stats_lock:
+        return dict(_stats)
+
+def make_key(text, model, prompt_version):
+    """Content address for a summary: the same story text under the same model and prompt maps to one entry"""
+    digest = hashlib.sha256()
+    for part in (model, str(prompt_version), text or ''):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def _expiry_cutoff():
+    ttl_hours = current_app.config.get('SUMMARY_CACHE_TTL_HOURS', 168)
+    return datetime.utcnow() - timedelta(hours=ttl_hours)
+
+def get(key):
+    """Return the cached response for key, or None on a miss or an expired entry"""
+    if not current_app.config.get('SUMMARY_CACHE_ENABLED', True):
+        return None
+
+    try:
+        entry = db.session.get(SummaryCache, key)
+        if not entry or entry.created_at < _expiry_cutoff():
+            _count('misses')
+            return None
+
+        entry.hits = (entry.hits or 0) + 1
+        entry.last_used_at = datetime.utcnow()
+        db.session.commit()
+        _count('hits')
+        return entry.response
+    except Exception as e:
+        logger.error(f"Failed to read summary cache: {str(e)}")
+        db.session.rollback()
+        _count('misses')
+        return None
+
+def put(key, model, response):
+    """Store a validated response and evict expired or least recently used entries"""
+    if not current_app.config.get('SUMMARY_CACHE_ENABLED', True):
+        return
+
+    try:
+        entry = db.session.get(SummaryCache, key)
+        if entry:
+            entry.response = response
+            entry.created_at = datetime.utcnow()
+            entry.last_used_at = entry.created_at
+        else:
+            db.session.add(SummaryCache(key=key, model=model, response=response))
+        db.session.commit()
+        _count('stores')
+        evict()
+    except Exception as e:
+        logger.error(f"Failed to store summary in cache: {str(e)}")
+        db.session.rollback()
+
+def evict():
+    """Drop expired entries, then trim the cache to SUMMARY_CACHE_MAX_ENTRIES by last use"""
+    try:
+        removed = SummaryCache.query\
+            .filter(SummaryCache.created_at < _expiry_cutoff())\
+            .delete(synchronize_session=False)
+
+        max_entries = current_app.config.get('SUMMARY_CACHE_MAX_ENTRIES', 5000)
+        overflow = SummaryCache.query.count() - max_entries
+        if overflow > 0:
+            stale_keys = [row.key for row in SummaryCache.query
+                          .with_entities(SummaryCache.key)
+                          .order_by(SummaryCache.last_used_at.asc())
+                          .limit(overflow)]
+            removed += SummaryCache.query\
+                .filter(SummaryCache.key.in_(stale_keys))\
+                .delete(synchronize_session=False)
+
+        db.session.commit()
+        if removed:
+            _count('evictions', removed)
+            logger.info(f"Evicted {removed} summary cache entries")
+    except Exception as e:
+        logger.error(f"Failed to evict summary cache entries: {str(e)}")
+        db.session.rollback()
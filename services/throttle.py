@@ -0,0 +1,201 @@
+"""Per-provider request scheduling: a token bucket for the request rate and an
+adaptive (AIMD) concurrency limit, with waiting work served in priority order.
+
+Workers hold a slot while they use a provider (limiter.slot(priority)) and
+make each API request through limiter.call(), which waits for a token and
+retries 429/5xx responses with backoff. Every outcome feeds the concurrency
+limit: successes at normal latency raise it by about one per window, rising
+latency trims it by a tenth, and throttling or server errors halve it.
+"""
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from services.metrics import PROVIDER_THROTTLED
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUSES = (408, 409, 429, 500, 502, 503, 504, 529)
+LATENCY_FLOOR = 0.05  # seconds
+
+def error_status(error):
+    """HTTP status behind a provider SDK exception, if any"""
+    for source in (error, getattr(error, 'response', None)):
+        status = getattr(source, 'status_code', None) or getattr(source, 'status', None)
+        if isinstance(status, int):
+            return status
+    return None
+
+def retry_after(error):
+    """Seconds the provider asked us to wait, from a Retry-After header"""
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+class TokenBucket:
+    """Allows rate requests per second on average, with bursts of up to burst requests"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def pause(self, seconds):
+        """Hand out no tokens for seconds, e.g. after the provider answered 429"""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(min(wait, 1.0))
+
+class ProviderLimiter:
+    def __init__(self, name, rate_per_minute, burst, max_concurrency, min_concurrency=1,
+                 max_retries=3, backoff_base=2.0, max_backoff=60.0, latency_tolerance=2.0):
+        self.name = name
+        self.bucket = TokenBucket(rate_per_minute / 60.0, burst)
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        # Start at the configured ceiling; throttling is what pushes the limit down
+        self.limit = float(self.max_concurrency)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self.latency_tolerance = latency_tolerance
+        self.baseline_latency = None
+        self.recent_latency = None
+        self.in_use = 0
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def slot(self, priority=0):
+        """Hold one unit of the provider's concurrency; lower priority values are served first"""
+        entry = (priority, next(self._sequence))
+        with self._condition:
+            heapq.heappush(self._waiters, entry)
+            while self._waiters[0] != entry or self.in_use >= int(self.limit):
+                self._condition.wait()
+            heapq.heappop(self._waiters)
+            self.in_use += 1
+            self._condition.notify_all()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.in_use -= 1
+                self._condition.notify_all()
+
+    def _adjust(self, limit):
+        with self._condition:
+            previous = int(self.limit)
+            self.limit = min(float(self.max_concurrency), max(float(self.min_concurrency), limit))
+            if int(self.limit) != previous:
+                logger.debug(f"{self.name} concurrency limit {previous} -> {int(self.limit)}")
+            self._condition.notify_all()
+
+    def record_success(self, latency):
+        # The baseline follows the fastest responses and slowly forgets them; the recent
+        # average smooths out single slow calls. Sub-LATENCY_FLOOR differences are noise.
+        with self._condition:
+            latency = max(latency, LATENCY_FLOOR)
+            if self.baseline_latency is None or latency < self.baseline_latency:
+                self.baseline_latency = latency
+            else:
+                self.baseline_latency += (latency - self.baseline_latency) * 0.01
+            if self.recent_latency is None:
+                self.recent_latency = latency
+            else:
+                self.recent_latency += (latency - self.recent_latency) * 0.2
+
+            if self.recent_latency > self.baseline_latency * self.latency_tolerance:
+                self._adjust(self.limit * 0.9)
+            else:
+                self._adjust(self.limit + 1.0 / self.limit)
+
+    def record_throttle(self, wait=None):
+        PROVIDER_THROTTLED.labels(self.name).inc()
+        self._adjust(self.limit / 2)
+        if wait:
+            self.bucket.pause(wait)
+
+    def call(self, fn, *args, **kwargs):
+        """Make one API request at the provider's rate, retrying throttled and 5xx responses"""
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            started = time.monotonic()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                status = error_status(e)
+                if status not in RETRYABLE_STATUSES:
+                    raise
+                wait = retry_after(e)
+                self.record_throttle(wait)
+                if attempt == self.max_retries:
+                    raise
+                delay = wait or min(self.max_backoff, self.backoff_base * 2 ** attempt) * random.uniform(0.5, 1.0)
+                logger.warning(f"{self.name} answered {status}, retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            self.record_success(time.monotonic() - started)
+            return result
+
+class Unlimited:
+    """Stand-in with the ProviderLimiter interface that never waits, for sequential runs"""
+
+    def slot(self, priority=0):
+        return nullcontext()
+
+    def call(self, fn, *args, **kwargs):
+        return fn(*args, **kwargs)
+
+# Config keys per provider: (requests per minute, burst, concurrency ceiling)
+PROVIDER_SETTINGS = {
+    'claude': ('CLAUDE_RATE_PER_MINUTE', 'CLAUDE_BURST', 'SUMMARY_CONCURRENCY'),
+    'replicate': ('REPLICATE_RATE_PER_MINUTE', 'REPLICATE_BURST', 'IMAGE_CONCURRENCY')
+}
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_limiter(name, config):
+    """The process-wide limiter for a provider ('claude' or 'replicate'), built from config on first use"""
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            rate_key, burst_key, concurrency_key = PROVIDER_SETTINGS[name]
+            limiter = ProviderLimiter(
+                name,
+                rate_per_minute=config.get(rate_key, 50),
+                burst=config.get(burst_key, 5),
+                max_concurrency=config.get(concurrency_key, 4),
+                min_concurrency=config.get('PROVIDER_MIN_CONCURRENCY', 1),
+                max_retries=config.get('PROVIDER_MAX_RETRIES', 3),
+                backoff_base=config.get('PROVIDER_BACKOFF_BASE', 2.0)
+            )
+            _limiters[name] = limiter
+        return limiter
+
+def reset_limiters():
+    """Forget the limiters so the next get_limiter() rereads config"""
+    with _limiters_lock:
+        _limiters.clear()
@@ -1,7 +1,44 @@
-let currentPage = 1;
+let nextCursor = null;
+let firstPage = true;
 let loading = false;
 let hasMore = true;
 let articleModal;
+let lastEventId = null;
+const seenArticleIds = new Set();
+
+// Loaded articles are kept for the tab's session so a reload renders instantly and only replays missed events
+const FEED_CACHE_KEY = 'jsj-feed';
+const FEED_CACHE_MAX_AGE_MS = 10 * 60 * 1000;
+let feedCache = { articles: [], nextCursor: null, lastEventId: null, savedAt: 0 };
+
+function saveFeedCache() {
+    feedCache.nextCursor = nextCursor;
+    feedCache.lastEventId = lastEventId;
+    feedCache.savedAt = Date.now();
+    try {
+        sessionStorage.setItem(FEED_CACHE_KEY, JSON.stringify(feedCache));
+    } catch (error) {
+        console.warn('Could not cache feed:', error.message);
+    }
+}
+
+function restoreFeedCache() {
+    try {
+        const cached = JSON.parse(sessionStorage.getItem(FEED_CACHE_KEY));
+        if (!cached || !Array.isArray(cached.articles) || !cached.articles.length) return false;
+        if (Date.now() - cached.savedAt > FEED_CACHE_MAX_AGE_MS) return false;
+
+        feedCache = cached;
+        nextCursor = cached.nextCursor;
+        hasMore = nextCursor !== null;
+        lastEventId = cached.lastEventId;
+        firstPage = false;
+        renderArticles(cached.articles);
+        return true;
+    } catch (error) {
+        return false;
+    }
+}
 
 function showError(message) {
     const container = document.querySelector('.error-container') || (() => {
@@ -30,14 +67,43 @@ function validateArticleData(article) {
 
     const images = Array.isArray(article.images) ? article.images : [];
     const prompts = Array.isArray(article.prompts) ? article.prompts : [];
+    const variants = Array.isArray(article.variants) ? article.variants : [];
 
     return {
         ...article,
         images: images.filter(url => url && typeof url === 'string'),
-        prompts: prompts.filter(prompt => prompt && typeof prompt === 'string')
+        prompts: prompts.filter(prompt => prompt && typeof prompt === 'string'),
+        variants: variants
     };
 }
 
+// Cards and modal panels are full width on phones and half width from the md breakpoint
+const PANEL_SIZES = '(min-width: 768px) 50vw, 100vw';
+
+function applyImageVariant(img, variant) {
+    // Let the browser pick the smallest resized panel that fills the slot, painting the blurred placeholder meanwhile
+    if (!variant || !Array.isArray(variant.srcset) || !variant.srcset.length) return;
+
+    img.srcset = variant.srcset.map(([url, width]) => `${url} ${width}w`).join(', ');
+    img.sizes = PANEL_SIZES;
+    if (variant.width && variant.height) {
+        img.width = variant.width;
+        img.height = variant.height;
+    }
+    if (variant.placeholder) {
+        img.style.backgroundImage = `url("${variant.placeholder}")`;
+        img.style.backgroundSize = 'cover';
+        img.addEventListener('load', () => { img.style.backgroundImage = ''; }, { once: true });
+    }
+}
+
+function showImageFallback(img) {
+    img.removeAttribute('srcset');
+    img.style.backgroundImage = '';
+    img.src = 'https://placehold.co/768x768?text=Comic+News';
+    img.alt = 'Failed to load image';
+}
+
 function cleanPromptText(prompt) {
     return prompt.replace(/A black and white stick figure comic panel in XKCD style\.\s*The linework should be simple and clean, typical of XKCD comics\.\s*/i, '').trim();
 }
@@ -66,13 +132,14 @@ function showArticleDetails(article) {
             container.className = 'image-container';
 
             const img = document.createElement('img');
+            applyImageVariant(img, validatedArticle.variants[index]);
             img.src = imageUrl;
             img.alt = `${validatedArticle.title} - Image ${index + 1}`;
             img.loading = 'lazy';
 
             img.onerror = function() {
-                this.src = 'https://placehold.co/768x768?text=Comic+News';
-                this.alt = 'Failed to load image';
+                this.onerror = null;
+                showImageFallback(this);
             };
 
             const promptDiv = document.createElement('div');
@@ -99,7 +166,8 @@ async function loadArticles() {
     loading = true;
 
     try {
-        const response = await fetch(`/api/news/${currentPage}`);
+        const url = nextCursor ? `/api/news?cursor=${encodeURIComponent(nextCursor)}` : '/api/news';
+        const response = await fetch(url);
         if (!response.ok) {
             throw new Error(`Server error: ${response.status}`);
         }
@@ -114,16 +182,16 @@ async function loadArticles() {
             throw new Error('Invalid response format: articles not found');
         }
 
-        if (articles.length === 0) {
-            hasMore = false;
-            if (currentPage === 1) {
-                showError('No articles available at the moment. Please try again later.');
-            }
-            return;
+        if (articles.length === 0 && firstPage) {
+            showError('No articles available at the moment. Please try again later.');
         }
 
         renderArticles(articles);
-        currentPage++;
+        firstPage = false;
+        nextCursor = data.next_cursor || null;
+        hasMore = nextCursor !== null;
+        feedCache.articles.push(...articles);
+        saveFeedCache();
     } catch (error) {
         console.error('Error loading articles:', error.message);
         showError(`Failed to load articles: ${error.message}`);
@@ -134,7 +202,7 @@ async function loadArticles() {
     }
 }
 
-function renderArticles(articles) {
+function renderArticles(articles, prepend = false) {
     const container = document.getElementById('articles-container');
     const template = document.getElementById('article-template');
 
@@ -142,34 +210,105 @@ function renderArticles(articles) {
         try {
             const validatedArticle = validateArticleData(article);
             if (!validatedArticle.images.length) return;
+            if (validatedArticle.id !== undefined) {
+                if (seenArticleIds.has(validatedArticle.id)) return;
+                seenArticleIds.add(validatedArticle.id);
+            }
 
             const clone = template.content.cloneNode(true);
             const card = clone.querySelector('.article-card');
             const previewImage = clone.querySelector('.article-preview-image');
 
+            applyImageVariant(previewImage, validatedArticle.variants[0]);
             previewImage.src = validatedArticle.images[0];
             previewImage.alt = validatedArticle.title;
             previewImage.loading = 'lazy';
 
             previewImage.onerror = function() {
-                this.src = 'https://placehold.co/768x768?text=Comic+News';
-                this.alt = 'Failed to load image';
+                this.onerror = null;
+                showImageFallback(this);
             };
 
             clone.querySelector('.article-title').textContent = validatedArticle.title;
             card.addEventListener('click', () => showArticleDetails(validatedArticle));
 
-            container.appendChild(clone);
+            if (prepend) {
+                container.prepend(clone);
+            } else {
+                container.appendChild(clone);
+            }
         } catch (error) {
             console.error('Failed to render article:', error);
         }
     });
 }
 
+// Readers the server has no stream slot for (or browsers without EventSource) check the first page instead
+const FEED_POLL_INTERVAL_MS = 60000;
+let pollTimer = null;
+
+async function pollNewArticles() {
+    try {
+        const response = await fetch('/api/news');
+        if (!response.ok) return;
+        const data = await response.json();
+        if (!data.success || !Array.isArray(data.articles)) return;
+
+        // Prepended one at a time, so the oldest new article goes first
+        const fresh = data.articles.filter(article => !seenArticleIds.has(article.id)).reverse();
+        if (!fresh.length) return;
+        renderArticles(fresh, true);
+        feedCache.articles.unshift(...fresh.slice().reverse());
+        saveFeedCache();
+    } catch (error) {
+        console.error('Failed to poll for new articles:', error);
+    }
+}
+
+function startPolling() {
+    if (pollTimer) return;
+    pollTimer = setInterval(pollNewArticles, FEED_POLL_INTERVAL_MS);
+}
+
+function connectStream() {
+    if (!window.EventSource) {
+        startPolling();
+        return;
+    }
+
+    // EventSource sends Last-Event-ID itself when it reconnects; the query parameter covers page reloads
+    const url = lastEventId ? `/api/news/stream?last_event_id=${encodeURIComponent(lastEventId)}` : '/api/news/stream';
+    const source = new EventSource(url);
+
+    source.addEventListener('article', event => {
+        try {
+            const article = JSON.parse(event.data);
+            lastEventId = event.lastEventId || lastEventId;
+            if (article.id === undefined || !seenArticleIds.has(article.id)) {
+                renderArticles([article], true);
+                feedCache.articles.unshift(article);
+            }
+            saveFeedCache();
+        } catch (error) {
+            console.error('Failed to handle streamed article:', error);
+        }
+    });
+
+    // EventSource reconnects by itself after network errors but gives up on an error status such as 503
+    source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED) {
+            startPolling();
+        }
+    };
+}
+
 // Initialize
 document.addEventListener('DOMContentLoaded', () => {
     articleModal = new bootstrap.Modal(document.getElementById('articleModal'));
-    loadArticles();
+    if (!restoreFeedCache()) {
+        loadArticles();
+    }
+    connectStream();
 });
 
 // Infinite scroll with debounce
@@ -0,0 +1,30 @@
+import atexit
+import logging
+import os
+import time
+from app import create_app, setup_database, start_scheduler, clear_stale_metrics
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def run_worker():
+    """Run the ingestion scheduler in its own process, separate from the web workers"""
+    app = create_app('job')
+    # Only now: prometheus_client picks file-backed values at import, once create_app set PROMETHEUS_MULTIPROC_DIR
+    from prometheus_client import multiprocess
+
+    clear_stale_metrics(app.config["METRICS_DIR"])
+    # Live gauges of this process stop being reported once it exits
+    atexit.register(multiprocess.mark_process_dead, os.getpid())
+    setup_database(app)
+    scheduler = start_scheduler(app)
+    logger.info("Ingestion worker started")
+    try:
+        while True:
+            time.sleep(60)
+    except (KeyboardInterrupt, SystemExit):
+        logger.info("Ingestion worker shutting down")
+        scheduler.shutdown()
+
+if __name__ == "__main__":
+    run_worker()